@@ -1,11 +1,24 @@
+import os
 import sys
+import copy
 import unittest
 import argparse
 import unittest
 import functools
+import tempfile
 import importlib
-from .cases import _IrcTestCase
-from .runner import TextTestRunner
+import multiprocessing
+import multiprocessing.util
+from .cases import _IrcTestCase, BaseServerTestCase
+from . import phases
+from . import processes
+from .probe import get_server_probe
+from .report import write_results, read_results, print_matrix, merge
+from .schedule import TimingStore, shard
+from .server_pool import ServerPool, ServerPrefetcher
+from .incremental import ResultCache
+from .parallel import ParallelTestSuite, SharedServerTestSuite
+from .runner import TextTestRunner, iter_tests, skip_unmet_requirements
 from .specifications import Specifications
 from .basecontrollers import BaseClientController, BaseServerController
 
@@ -29,6 +42,7 @@ def main(args):
         exit(1)
     _IrcTestCase.controllerClass = controller_class
     _IrcTestCase.controllerClass.openssl_bin = args.openssl_bin
+    _IrcTestCase.controllerClass.in_process_tls = args.in_process_tls
     _IrcTestCase.show_io = args.show_io
     _IrcTestCase.strictTests = not args.loose
     if args.specification:
@@ -47,27 +61,192 @@ def main(args):
         controller_class.software_name,
         ', '.join(sorted(map(lambda x:x.value,
             _IrcTestCase.testedSpecifications)))))
+    if issubclass(controller_class, BaseServerController) and args.probe:
+        probe = get_server_probe(controller_class)
+        if probe:
+            (_IrcTestCase.probed_capabilities,
+                    _IrcTestCase.probed_isupport) = probe
+    if args.reuse_servers:
+        BaseServerTestCase.server_pool = ServerPool()
+        # Unlike atexit handlers, finalizers also run in processes of
+        # main_matrix()
+        multiprocessing.util.Finalize(None,
+                BaseServerTestCase.server_pool.close, exitpriority=10)
+    if issubclass(controller_class, BaseServerController):
+        prefetch = args.prefetch
+    else:
+        prefetch = 0 # Clients are started by the tests themselves
+    if prefetch and args.jobs <= 1:
+        # Worker processes start their own when running in parallel.
+        BaseServerTestCase.prefetcher = ServerPrefetcher(controller_class,
+                BaseServerTestCase.port_broker, prefetch)
+        multiprocessing.util.Finalize(None,
+                BaseServerTestCase.prefetcher.close, exitpriority=10)
     ts = module.discover()
+    skip_unmet_requirements(ts)
+    timings = TimingStore(args.module, args.timings or 'timings.json')
+    if args.shard:
+        (index, nb_shards) = args.shard
+        # Only balance with durations given explicitly, as they must be
+        # the same on all machines.
+        ts = shard(ts, index, nb_shards,
+                timings=timings if args.timings else None)
+    ts = timings.longest_first(ts)
+    if args.incremental:
+        results = ResultCache(controller_class, flags=(
+            sorted(x.value for x in _IrcTestCase.testedSpecifications),
+            args.loose, args.openssl_bin, args.reuse_servers,
+            bool(args.shared_server)))
+        ts = results.replay_unchanged(ts)
+        print('Reusing results of {} unchanged test(s).'.format(
+            results.nb_reused))
+    # The suite forgets its tests as they run.
+    tests = list(iter_tests(ts))
+    print('Estimated duration: {:.0f}s'.format(timings.estimate_duration(
+        ts, max(args.jobs, args.shared_server, 1))))
+    if args.shared_server:
+        ts = SharedServerTestSuite(ts, threads=args.shared_server)
+    elif args.jobs > 1:
+        ts = ParallelTestSuite(ts, jobs=args.jobs, prefetch=prefetch)
     testRunner = TextTestRunner(
             verbosity=args.verbose,
             descriptions=True,
             )
     testLoader = unittest.loader.defaultTestLoader
     result = testRunner.run(ts)
+    timings.record_run(tests, result)
+    if args.phase_times:
+        print()
+        if args.verbose > 1:
+            phases.print_test_phases(result.test_phases)
+            print()
+        phases.print_aggregate(controller_class.software_name,
+                result.test_phases)
+    if args.incremental:
+        results.update(tests, result)
+    if args.results:
+        write_results(args.results, controller_class.software_name,
+                tests, result)
     if result.failures or result.errors:
         exit(1)
     else:
         exit(0)
 
 
+def shard_argument(s):
+    try:
+        (index, nb_shards) = map(int, s.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+                'must be of the form i/N, eg. 1/4') from None
+    if not 1 <= index <= nb_shards:
+        raise argparse.ArgumentTypeError(
+                'i must be between 1 and N')
+    return (index, nb_shards)
+
+def _run_logged(args, log_path):
+    multiprocessing.util.Finalize(None, processes.kill_remaining,
+            exitpriority=0)
+    with open(log_path, 'w') as log:
+        # Also redirects output of the tested software.
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+    sys.stdout = open(1, 'w', closefd=False, buffering=1)
+    sys.stderr = open(2, 'w', closefd=False, buffering=1)
+    main(args)
+
+def main_matrix(args):
+    """Tests each of the modules given as arguments in a process of its
+    own, concurrently, then prints the outcome of each test with each of
+    them."""
+    run_directory = tempfile.mkdtemp(prefix='irctest-matrix-')
+    context = multiprocessing.get_context('fork')
+    runs = []
+    for module in args.module:
+        module_args = copy.copy(args)
+        module_args.module = module
+        module_args.results = os.path.join(run_directory,
+                '{}.json'.format(module))
+        log_path = os.path.join(run_directory, '{}.log'.format(module))
+        process = context.Process(target=_run_logged,
+                args=(module_args, log_path))
+        process.start()
+        runs.append((module, module_args.results, log_path, process))
+    columns = []
+    failed = False
+    for (module, results_path, log_path, process) in runs:
+        process.join()
+        try:
+            (software_name, tests) = read_results(results_path)
+        except (OSError, ValueError):
+            print('Could not test {}, see {}'.format(module, log_path),
+                    file=sys.stderr)
+            columns.append((module, None))
+            failed = True
+            continue
+        print('Output of {} is in {}'.format(software_name, log_path))
+        columns.append((software_name, tests))
+        failed = failed or process.exitcode != 0
+    print()
+    print_matrix(columns)
+    exit(1 if failed else 0)
+
 parser = argparse.ArgumentParser(
         description='A script to test interoperability of IRC software.')
-parser.add_argument('module', type=str,
-        help='The module used to run the tested program.')
+parser.add_argument('module', type=str, nargs='+',
+        help='The module used to run the tested program. If several are '
+        'given, they are tested concurrently and a table of the outcomes '
+        'of each test with each of them is printed.')
 parser.add_argument('--openssl-bin', type=str, default='openssl',
         help='The openssl binary to use')
+parser.add_argument('--in-process-tls', action='store_true',
+        help='Generate TLS keys and certificates with the cryptography '
+        'module instead of the openssl binary.')
 parser.add_argument('--show-io', action='store_true',
         help='Show input/outputs with the tested program.')
+parser.add_argument('-j', '--jobs', type=int, default=1,
+        help='Number of worker processes to run tests in. Each of them '
+        'runs its own instances of the tested program.')
+parser.add_argument('--no-probe', dest='probe', action='store_false',
+        help='Do not skip tests requiring capabilities or ISUPPORT tokens '
+        'the server did not advertise when it was last probed.')
+parser.add_argument('--reuse-servers', action='store_true',
+        help='Keep servers running between tests using the same server '
+        'parameters, instead of starting one for each test.')
+parser.add_argument('--shared-server', type=int, metavar='THREADS',
+        default=0,
+        help='Run server tests in this many threads, all connected to '
+        'the same server. Nicks and channel names are rewritten so tests '
+        'do not interfere. Cannot be used with --jobs.')
+parser.add_argument('--workdir', type=str,
+        help='Directory to put configuration and data of the tested '
+        'software in, eg. /dev/shm to keep them in memory. Defaults to '
+        'the system\'s temporary directory.')
+parser.add_argument('--prefetch', type=int, metavar='K', default=0,
+        help='Keep K servers with the default parameters starting in the '
+        'background (in each worker process), so tests do not wait for '
+        'them to start. Cannot be used with --reuse-servers or '
+        '--shared-server.')
+parser.add_argument('--timings', type=str,
+        help='File to read and record durations of tests in, so the '
+        'longest tests are run first. Relative paths are in the cache '
+        'directory. Defaults to timings.json.')
+parser.add_argument('--phase-times', action='store_true',
+        help='Show how much time tests spent starting servers, '
+        'registering clients, reading messages, etc. With -v, also show '
+        'it for each test.')
+parser.add_argument('--incremental', action='store_true',
+        help='Only run tests that failed or whose inputs (tested program, '
+        'controller, test code, or options) changed since their last run, '
+        'and report the previous results of the others.')
+parser.add_argument('--shard', type=shard_argument, metavar='i/N',
+        help='Only run the i-th of N parts of the test suite. Parts are '
+        'the same on all machines, and have about the same duration if '
+        '--timings is given (with the same file on all machines).')
+parser.add_argument('--results', type=str, metavar='FILE',
+        help='Write outcomes of tests to this file, as JSON. Results '
+        'of several runs can then be reported together with '
+        '“python3 -m irctest merge FILE...”.')
 parser.add_argument('-v', '--verbose', action='count', default=1,
         help='Verbosity. Give this option multiple times to make '
         'it even more verbose.')
@@ -83,5 +262,32 @@ parser.add_argument('-l', '--loose', action='store_true',
         'interpretation is choosen.')
 
 
+if sys.argv[1:2] == ['merge']:
+    merge(sys.argv[2:])
 args = parser.parse_args()
-main(args)
+if args.shared_server and args.jobs > 1:
+    parser.error('--shared-server cannot be used with --jobs.')
+if args.prefetch and (args.reuse_servers or args.shared_server):
+    parser.error('--prefetch cannot be used with --reuse-servers or '
+            '--shared-server.')
+if args.workdir:
+    if not os.path.isdir(args.workdir):
+        parser.error('--workdir must be an existing directory.')
+    # Used by controllers' create_config(), and for the directories of
+    # worker processes.
+    tempfile.tempdir = args.workdir
+if args.in_process_tls:
+    try:
+        import cryptography
+    except ImportError:
+        parser.error('--in-process-tls requires the cryptography module.')
+processes.start_run()
+# Runs after other finalizers, which stop servers they know about.
+multiprocessing.util.Finalize(None, processes.kill_run, exitpriority=0)
+if len(args.module) > 1:
+    if args.results:
+        parser.error('--results cannot be used with several modules.')
+    main_matrix(args)
+else:
+    (args.module,) = args.module
+    main(args)
@@ -2,10 +2,12 @@ import os
 import shutil
 import socket
 import tempfile
-import time
-import subprocess
-import psutil
 
+from . import tls
+from . import phases
+from . import reaper
+from . import processes
+from . import readiness
 from .runner import NotImplementedByController
 
 class _BaseController:
@@ -14,35 +16,43 @@ class _BaseController:
     A software controller is an object that handles configuring and running
     a process (eg. a server or a client), as well as sending it instructions
     that are not part of the IRC specification."""
-    pass
+    software_executable = None # Name of the command running the software
+    def execute(self, args, **kwargs):
+        """Starts the software, with the same arguments as
+        subprocess.Popen, in a session of its own so it can be stopped
+        along with its children by irctest.processes.kill_tree().
+
+        Its output is captured, see irctest.processes.captured_output()."""
+        return processes.spawn(args, **kwargs)
 
 class DirectoryBasedController(_BaseController):
     """Helper for controllers whose software configuration is based on an
     arbitrary directory."""
+    openssl_bin = 'openssl'
+    in_process_tls = False # Generate TLS material without openssl_bin
     def __init__(self):
         super().__init__()
         self.directory = None
         self.proc = None
 
     def kill_proc(self):
-        """Terminates the controlled process, waits for it to exit, and
-        eventually kills it."""
-        self.proc.terminate()
-        try:
-            self.proc.wait(5)
-        except subprocess.TimeoutExpired:
-            self.proc.kill()
+        """Terminates the controlled process and its children, waits for
+        them to exit, and eventually kills them."""
+        processes.kill_tree(self.proc)
         self.proc = None
     def kill(self):
-        """Calls `kill_proc` and cleans the configuration."""
+        """Calls `kill_proc` and cleans the configuration, in a background
+        thread. The controller must not be used after this."""
+        reaper.get_reaper().submit(self.kill_sync)
+    def kill_sync(self):
+        """Same as `kill`, but returns when it is done."""
         if self.proc:
             self.kill_proc()
         if self.directory:
             shutil.rmtree(self.directory)
     def terminate(self):
         """Stops the process gracefully, and does not clean its config."""
-        self.proc.terminate()
-        self.proc.wait()
+        processes.kill_tree(self.proc, timeout=None)
         self.proc = None
     def open_file(self, name, mode='a'):
         """Open a file in the configuration directory."""
@@ -63,21 +73,21 @@ class DirectoryBasedController(_BaseController):
             return True
 
     def gen_ssl(self):
-        self.csr_path = os.path.join(self.directory, 'ssl.csr')
+        """Puts a private key, a certificate, and DH parameters in the
+        configuration directory. They are the same for all controllers,
+        and only generated when missing from irctest's cache."""
         self.key_path = os.path.join(self.directory, 'ssl.key')
         self.pem_path = os.path.join(self.directory, 'ssl.pem')
         self.dh_path = os.path.join(self.directory, 'dh.pem')
-        subprocess.check_output([self.openssl_bin, 'req', '-new', '-newkey', 'rsa',
-            '-nodes', '-out', self.csr_path, '-keyout', self.key_path,
-            '-batch'],
-            stderr=subprocess.DEVNULL)
-        subprocess.check_output([self.openssl_bin, 'x509', '-req',
-            '-in', self.csr_path, '-signkey', self.key_path,
-            '-out', self.pem_path],
-            stderr=subprocess.DEVNULL)
-        subprocess.check_output([self.openssl_bin, 'dhparam',
-            '-out', self.dh_path, '128'],
-            stderr=subprocess.DEVNULL)
+        with tls.material_directory(self.openssl_bin,
+                self.in_process_tls) as material:
+            for (name, path) in ((tls.KEY_FILE, self.key_path),
+                    (tls.CERT_FILE, self.pem_path),
+                    (tls.DH_FILE, self.dh_path)):
+                try:
+                    os.link(os.path.join(material, name), path)
+                except OSError: # eg. on a different filesystem
+                    shutil.copy(os.path.join(material, name), path)
 
 class BaseClientController(_BaseController):
     """Base controller for IRC clients."""
@@ -87,15 +97,18 @@ class BaseClientController(_BaseController):
 class BaseServerController(_BaseController):
     """Base controller for IRC server."""
     port_open = False
+    dirty = False # Whether tests changed the server's state
+    readiness_strategy = readiness.ConnectProbe()
     def run(self, hostname, port, password,
             valid_metadata_keys, invalid_metadata_keys):
         raise NotImplementedError()
     def registerUser(self, case, username, password=None):
         raise NotImplementedByController('account registration')
-    def wait_for_port(self):
-        while not self.port_open:
-            time.sleep(0.1)
-            for conn in psutil.Process(self.proc.pid).connections():
-                if conn.laddr[1] == self.port:
-                    self.port_open = True
+    def wait_for_port(self, hostname):
+        """Waits until the server accepts clients on `hostname` and its
+        port."""
+        if not self.port_open:
+            with phases.phase('wait for port'):
+                self.readiness_strategy.wait(self, hostname)
+            self.port_open = True
 
@@ -0,0 +1,100 @@
+"""Storage for data that is expensive to compute and kept between runs,
+eg. what a given build of a server advertises."""
+
+import os
+import json
+import fcntl
+import shutil
+import hashlib
+import inspect
+import functools
+import tempfile
+
+def cache_directory(*path):
+    """Returns the path to a directory in irctest's cache, creating it if
+    needed. Defaults to ~/.cache/irctest/, and can be overridden with the
+    IRCTEST_CACHE_DIR environment variable."""
+    base = os.environ.get('IRCTEST_CACHE_DIR') or os.path.join(
+            os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+            'irctest')
+    directory = os.path.join(base, *path)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+@functools.lru_cache()
+def _hash_file(path, mtime, size):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fd:
+        for chunk in iter(lambda: fd.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_fingerprint(path):
+    """Returns a hash of the content of a file. It is only recomputed if
+    the file's mtime or size changed."""
+    stat = os.stat(path)
+    return _hash_file(os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+def executable_fingerprint(name):
+    """Returns a hash of the executable that would be run for the given
+    command name, or None if it is not in the PATH."""
+    path = shutil.which(name)
+    if path is None:
+        return None
+    return file_fingerprint(path)
+
+def controller_fingerprint(controller_class):
+    """Returns a string identifying a controller and the software it runs,
+    or None if the software's executable is not declared or cannot be
+    found."""
+    name = getattr(controller_class, 'software_executable', None)
+    if name is None:
+        return None
+    executable = executable_fingerprint(name)
+    if executable is None:
+        return None
+    return '{}.{}:{}:{}'.format(
+            controller_class.__module__, controller_class.__qualname__,
+            file_fingerprint(inspect.getsourcefile(controller_class)),
+            executable)
+
+class JsonStore:
+    """A dictionary persisted as a JSON file in the cache directory.
+
+    Several processes may use the same store; saving only overwrites the
+    keys that were set through this instance."""
+    def __init__(self, name):
+        self.path = os.path.join(cache_directory(), name)
+        self.data = self._load()
+        self.changed_keys = set()
+
+    def _load(self):
+        try:
+            with open(self.path) as fd:
+                return json.load(fd)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+    def __contains__(self, key):
+        return key in self.data
+    def __getitem__(self, key):
+        return self.data[key]
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.changed_keys.add(key)
+
+    def save(self):
+        """Atomically writes the store to disk, along with changes other
+        processes saved since it was loaded."""
+        with open(self.path + '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            data = self._load()
+            data.update((key, self.data[key]) for key in self.changed_keys)
+            self.data = data
+            (fd, temp_path) = tempfile.mkstemp(
+                    dir=os.path.dirname(self.path), suffix='.tmp')
+            with open(fd, 'w') as f:
+                json.dump(self.data, f, indent=1, sort_keys=True)
+            os.replace(temp_path, self.path)
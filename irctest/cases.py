@@ -8,17 +8,26 @@ import collections
 
 import supybot.utils
 
+from . import ports
+from . import phases
 from . import runner
+from . import processes
 from . import client_mock
 from . import authentication
+from .irc_utils import framing
 from .irc_utils import capabilities
 from .irc_utils import message_parser
+from .irc_utils import namespacing
 from .exceptions import ConnectionClosed
 from .specifications import Specifications
 
 class _IrcTestCase(unittest.TestCase):
     """Base class for test cases."""
     controllerClass = None # Will be set by __main__.py
+    # Capabilities and ISUPPORT tokens advertised by the server, if it
+    # was probed (see irctest.probe).
+    probed_capabilities = None
+    probed_isupport = None
 
     def description(self):
         method_doc = self._testMethodDoc
@@ -29,6 +38,90 @@ class _IrcTestCase(unittest.TestCase):
                 removeNewline=False,
                 ).strip().replace('\n ', '\n\t')
 
+    def __init__(self, methodName='runTest'):
+        super().__init__(methodName)
+        method = getattr(self, methodName, None)
+        if method is not None:
+            setattr(self, methodName, self._timeTestMethod(method))
+
+    @staticmethod
+    def _timeTestMethod(method):
+        """Wraps a test method to count its time as the 'test' phase of the
+        test, and what follows as 'tearDown' (see irctest.phases). What
+        happens before it is counted as 'setUp'."""
+        @functools.wraps(method)
+        def newf(*args, **kwargs):
+            try:
+                with phases.phase('test'):
+                    return method(*args, **kwargs)
+            finally:
+                phases.switch('tearDown')
+        return newf
+
+    def markOutputStart(self):
+        """Makes capturedOutput() ignore what the tested software wrote
+        before this, eg. for previous tests using the same server."""
+        proc = getattr(self.controller, 'proc', None)
+        self._output_start = processes.output_position(proc)
+    def saveCapturedOutput(self):
+        """Keeps what capturedOutput() returns now, so it can still be
+        reported after the software is stopped."""
+        self._captured_output = None
+        self._captured_output = self.capturedOutput()
+    def capturedOutput(self):
+        """Returns the end of what the tested software wrote to its
+        stdout and stderr during the test, or None if it is not known."""
+        saved = getattr(self, '_captured_output', None)
+        if saved is not None:
+            return saved
+        controller = getattr(self, 'controller', None)
+        proc = getattr(controller, 'proc', None)
+        if proc is None:
+            return None
+        return processes.captured_output(proc,
+                getattr(self, '_output_start', 0))
+
+    def checkRequirements(self):
+        """Raises SkipTest if the test method is declared (by the
+        decorators below) to require something that is not enabled or
+        that the controller does not support.
+
+        This does not need the controlled software to be running, so it
+        can be called before setUp."""
+        method = getattr(self, self._testMethodName)
+        specifications = getattr(method, 'required_specifications', None)
+        if specifications is not None:
+            if specifications.isdisjoint(self.testedSpecifications):
+                raise runner.NotRequiredBySpecifications()
+            if method.strict_test and not self.strictTests:
+                raise runner.SkipStrictTest()
+        # Not all controllers declare them
+        supported_mechanisms = getattr(self.controllerClass,
+                'supported_sasl_mechanisms', set())
+        supported_capabilities = getattr(self.controllerClass,
+                'supported_capabilities', set())
+        if getattr(method, 'requires_sasl', False) \
+                and not supported_mechanisms:
+            raise runner.NotImplementedByController('SASL')
+        for mechanism in sorted(
+                getattr(method, 'required_sasl_mechanisms', ())):
+            if mechanism not in supported_mechanisms:
+                raise runner.OptionalSaslMechanismNotSupported(mechanism)
+        for capability in sorted(
+                getattr(method, 'required_capabilities', ())):
+            if capability not in supported_capabilities:
+                raise runner.CapabilityNotSupported(capability)
+        capabilities = getattr(method, 'required_server_capabilities', ())
+        if self.probed_capabilities is not None:
+            missing = set(capabilities).difference(self.probed_capabilities)
+            if missing:
+                raise runner.NotImplementedByController(
+                        ', '.join(sorted(missing)))
+        for token in getattr(method, 'required_isupport_tokens', ()):
+            if self.probed_isupport is not None and \
+                    token not in self.probed_isupport:
+                raise runner.NotImplementedByController(token)
+
     def setUp(self):
         super().setUp()
         self.controller = self.controllerClass()
@@ -97,6 +190,7 @@ class BaseClientTestCase(_IrcTestCase):
         self.conn = None
         self._setUpServer()
     def tearDown(self):
+        self.saveCapturedOutput()
         if self.conn:
             try:
                 self.conn.sendall(b'QUIT :end of test.')
@@ -106,7 +200,6 @@ class BaseClientTestCase(_IrcTestCase):
                 pass # the conn was already closed by the test, or something
         self.controller.kill()
         if self.conn:
-            self.conn_file.close()
             self.conn.close()
         self.server.close()
 
@@ -133,11 +226,13 @@ class BaseClientTestCase(_IrcTestCase):
                 context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
                 context.load_cert_chain(certfile=certfile.name, keyfile=keyfile.name)
                 self.conn = context.wrap_socket(self.conn, server_side=True)
-        self.conn_file = self.conn.makefile(newline='\r\n',
-                encoding='utf8')
+        self.conn_reader = framing.LineReader(self.conn)
 
     def getLine(self):
-        line = self.conn_file.readline()
+        try:
+            line = self.conn_reader.readline() + '\r\n'
+        except ConnectionClosed:
+            line = ''
         if self.show_io:
             print('{:.3f} C: {}'.format(time.time(), line.strip()))
         return line
@@ -239,35 +334,97 @@ class BaseServerTestCase(_IrcTestCase):
     ssl = False
     valid_metadata_keys = frozenset()
     invalid_metadata_keys = frozenset()
+    port_broker = ports.PortBroker() # Shared with forked processes
+    server_pool = None # Set by __main__.py when servers are reused
+    prefetcher = None # Set when servers are started in advance
+    # Set by irctest.parallel.SharedServerTestSuite while tests run
+    # concurrently on the same server
+    shared_server = None
     def setUp(self):
         super().setUp()
         self.server_support = {}
-        self.find_hostname_and_port()
-        self.controller.run(self.hostname, self.port, password=self.password,
+        self.clients = {}
+        self.namespace = None
+        if self.shared_server is not None:
+            (self.controller, self.hostname, self.port) = self.shared_server
+            # Tests whose nicks become too long with the namespace's
+            # suffix run again on a server of their own.
+            nicklen = (self.probed_isupport or {}).get('NICKLEN')
+            self.namespace = namespacing.Namespace(
+                    nicklen=int(nicklen) if nicklen
+                    else namespacing.DEFAULT_NICKLEN)
+            self.markOutputStart()
+            return
+        with phases.phase('server start'):
+            if self.server_pool is not None:
+                (self.controller, self.hostname, self.port) = \
+                        self.server_pool.acquire(self)
+                self.markOutputStart()
+            elif self.prefetcher is not None and \
+                    self.hasDefaultServerParameters():
+                (self.controller, self.hostname, self.port) = \
+                        self.prefetcher.acquire()
+            else:
+                self.find_hostname_and_port()
+                self.controller.run(self.hostname, self.port,
+                        **self.server_parameters())
+    def tearDown(self):
+        self.saveCapturedOutput()
+        if self.namespace is not None:
+            for client in list(self.clients):
+                self.quitClient(client)
+        elif self.server_pool is None:
+            self.controller.kill()
+            for client in list(self.clients):
+                self.removeClient(client)
+        else:
+            for client in list(self.clients):
+                self.quitClient(client)
+            self.server_pool.release(self)
+    def server_parameters(self):
+        """Returns the arguments of the controller's run() method, other
+        than the hostname and port."""
+        return dict(password=self.password,
                 valid_metadata_keys=self.valid_metadata_keys,
                 invalid_metadata_keys=self.invalid_metadata_keys,
                 ssl=self.ssl)
-        self.clients = {}
-    def tearDown(self):
-        self.controller.kill()
-        for client in list(self.clients):
-            self.removeClient(client)
+    def isShareable(self):
+        """Returns whether the test can run at the same time as other tests
+        on the same server."""
+        method = getattr(self, self._testMethodName)
+        if getattr(method, 'exclusive_server', False):
+            return False
+        if getattr(method, 'requires_sasl', False) or \
+                getattr(method, 'required_sasl_mechanisms', None):
+            return False # Registers accounts
+        return self.hasDefaultServerParameters()
+    def hasDefaultServerParameters(self):
+        """Returns whether the server runs with the default parameters of
+        its controller's run() method."""
+        return self.password is None and not self.ssl and \
+                not self.valid_metadata_keys and \
+                not self.invalid_metadata_keys
+    def markServerDirty(self):
+        """Prevents the server from being reused by other tests, if servers
+        are reused."""
+        self.controller.dirty = True
     def find_hostname_and_port(self):
         """Find available hostname/port to listen on."""
-        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        s.bind(("",0))
-        (self.hostname, self.port) = s.getsockname()
-        s.close()
+        (self.hostname, self.port) = self.port_broker.reserve()
 
-    def addClient(self, name=None, show_io=None):
+    def addClient(self, name=None, show_io=None, max_inbox_size=None):
         """Connects a client to the server and adds it to the dict.
-        If 'name' is not given, uses the lowest unused non-negative integer."""
-        self.controller.wait_for_port()
+        If 'name' is not given, uses the lowest unused non-negative integer.
+        If 'max_inbox_size' is given, the client only keeps that many
+        of the messages it received and that were not read yet (see
+        irctest.client_mock.Inbox)."""
+        self.controller.wait_for_port(self.hostname)
         if not name:
             name = max(map(int, list(self.clients)+[0]))+1
         show_io = show_io if show_io is not None else self.show_io
         self.clients[name] = client_mock.ClientMock(name=name,
-                show_io=show_io)
+                show_io=show_io, namespace=self.namespace,
+                max_inbox_size=max_inbox_size)
         self.clients[name].connect(self.hostname, self.port)
         return name
 
@@ -278,14 +435,52 @@ class BaseServerTestCase(_IrcTestCase):
         self.clients[name].disconnect()
         del self.clients[name]
 
+    def quitClient(self, name):
+        """Sends QUIT and waits for the server to close the connection, so
+        the server is done with the client when this returns."""
+        try:
+            self.sendLine(name, 'QUIT')
+            while self.getMessages(name, synchronize=False):
+                pass
+        except (ConnectionClosed, OSError):
+            pass
+        else:
+            # The server did not close the connection.
+            self.markServerDirty()
+        self.removeClient(name)
+
     def getMessages(self, client, **kwargs):
         return self.clients[client].getMessages(**kwargs)
+    def syncAll(self, clients=None):
+        """Same as getMessages() on each of the given clients (all of them
+        by default), but in a single round-trip, and keeps the messages in
+        their inboxes so getMessage() returns them."""
+        if clients is None:
+            clients = list(self.clients)
+        with phases.phase('synchronization'):
+            client_mock.synchronize_all(
+                    [self.clients[client] for client in clients])
+    def getMessagesAll(self, clients=None):
+        """Same as getMessages() on each of the given clients (all of them
+        by default), but in a single round-trip. Returns a dict of client
+        name -> list of messages."""
+        if clients is None:
+            clients = list(self.clients)
+        self.syncAll(clients)
+        return {client: self.clients[client].inbox.drain()
+                for client in clients}
     def getMessage(self, client, **kwargs):
         return self.clients[client].getMessage(**kwargs)
+    def waitFor(self, client, predicate=None,
+            timeout=client_mock.WAIT_FOR_TIMEOUT):
+        """Returns the first message of the client for which `predicate`
+        returns True (or its next message if it is None), as soon as it is
+        received, and discards the ones before it. Fails if there is none
+        after `timeout` seconds."""
+        return self.clients[client].waitFor(predicate, timeout)
     def getRegistrationMessage(self, client):
         """Filter notices, do not send pings."""
-        return self.getMessage(client, synchronize=False,
-                filter_pred=lambda m:m.command != 'NOTICE')
+        return self.waitFor(client, lambda m:m.command != 'NOTICE')
     def sendLine(self, client, line):
         return self.clients[client].sendLine(line)
 
@@ -328,12 +523,13 @@ class BaseServerTestCase(_IrcTestCase):
         """Skip to the point where we are registered
         <https://tools.ietf.org/html/rfc2812#section-3.1>
         """
-        while True:
-            m = self.getMessage(client, synchronize=False)
-            if m.command == '001':
-                return m
+        return self.waitFor(client, lambda m:m.command == '001')
     def connectClient(self, nick, name=None, capabilities=None,
             skip_if_cap_nak=False):
+        with phases.phase('registration'):
+            return self._connectClient(nick, name, capabilities,
+                    skip_if_cap_nak)
+    def _connectClient(self, nick, name, capabilities, skip_if_cap_nak):
         client = self.addClient(name)
         if capabilities is not None and 0 < len(capabilities):
             self.sendLine(client, 'CAP REQ :{}'.format(' '.join(capabilities)))
@@ -358,7 +554,7 @@ class BaseServerTestCase(_IrcTestCase):
 
         # Skip all that happy welcoming stuff
         while True:
-            m = self.getMessage(client)
+            m = self.waitFor(client)
             if m.command == 'PONG':
                 break
             elif m.command == '005':
@@ -379,14 +575,16 @@ class BaseServerTestCase(_IrcTestCase):
 
     def joinChannel(self, client, channel):
         self.sendLine(client, 'JOIN {}'.format(channel))
-        # wait until we see them join the channel
-        joined = False
-        while not joined:
-            for msg in self.getMessages(client):
-                # todo: also respond to cannot join channel numeric
-                if msg.command.upper() == 'JOIN' and 0 < len(msg.params) and msg.params[0].lower() == channel.lower():
-                    joined = True
-                    break
+        # wait until we see them join the channel, and the end of the NAMES
+        # reply that follows
+        # todo: also respond to cannot join channel numeric
+        self.waitFor(client, lambda msg: msg.command.upper() == 'JOIN'
+                and 0 < len(msg.params)
+                and msg.params[0].lower() == channel.lower())
+        self.waitFor(client, lambda msg: msg.command == '366'
+                and 1 < len(msg.params)
+                and msg.params[1].lower() == channel.lower())
+        self.clients[client].inbox.drain()
 
 class OptionalityHelper:
     def checkSaslSupport(self):
@@ -405,6 +603,9 @@ class OptionalityHelper:
             def newf(self):
                 self.checkMechanismSupport(mech)
                 return f(self)
+            # Read by _IrcTestCase.checkRequirements
+            newf.required_sasl_mechanisms = \
+                    getattr(f, 'required_sasl_mechanisms', frozenset()) | {mech}
             return newf
         return decorator
 
@@ -413,8 +614,34 @@ class OptionalityHelper:
         def newf(self):
             self.checkSaslSupport()
             return f(self)
+        newf.requires_sasl = True
         return newf
 
+    def needsExclusiveServer(f):
+        """Declares that the test cannot share its server with other tests
+        running at the same time, eg. because it lists all channels."""
+        f.exclusive_server = True
+        return f
+
+    def skipUnlessServerAdvertises(*capabilities):
+        """Declares the test needs the server to advertise these
+        capabilities. The test is skipped before starting the server if
+        it was probed and does not; the test itself must still handle
+        the other case (eg. with `skip_if_cap_nak`)."""
+        def decorator(f):
+            f.required_server_capabilities = \
+                    getattr(f, 'required_server_capabilities', ()) + capabilities
+            return f
+        return decorator
+
+    def skipUnlessServerSupports(*tokens):
+        """Same as skipUnlessServerAdvertises, for ISUPPORT tokens."""
+        def decorator(f):
+            f.required_isupport_tokens = \
+                    getattr(f, 'required_isupport_tokens', ()) + tokens
+            return f
+        return decorator
+
     def checkCapabilitySupport(self, cap):
         if cap in self.controller.supported_capabilities:
             return
@@ -426,6 +653,8 @@ class OptionalityHelper:
             def newf(self):
                 self.checkCapabilitySupport(cap)
                 return f(self)
+            newf.required_capabilities = \
+                    getattr(f, 'required_capabilities', frozenset()) | {cap}
             return newf
         return decorator
 
@@ -446,5 +675,8 @@ class SpecificationSelector:
                 if strict and not self.strictTests:
                     raise runner.SkipStrictTest()
                 return f(self)
+            # Read by _IrcTestCase.checkRequirements
+            newf.required_specifications = specifications
+            newf.strict_test = strict
             return newf
         return decorator
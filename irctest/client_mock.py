@@ -1,96 +1,198 @@
 import ssl
 import time
 import socket
+import selectors
+import collections
+from . import phases
+from .irc_utils import framing
 from .irc_utils import message_parser
-from .exceptions import NoMessageException, ConnectionClosed
+from .exceptions import NoMessageException, ConnectionClosed, \
+        DeadlineExceeded
+
+# How long getMessages(synchronize=False) waits for the server to send
+# something, in seconds
+RECEIVE_TIMEOUT = 1
+# How often to report that it is still waiting for the server, with show_io
+WAITING_REPORT_INTERVAL = 1
+# How long waitFor() waits for a matching message by default, in seconds
+WAIT_FOR_TIMEOUT = 30
+
+class Inbox:
+    """Messages received by a client and not read yet, oldest first.
+
+    If `max_size` is not None, only the last `max_size` messages are kept,
+    and older ones are dropped; they are counted in `nb_dropped`, and by
+    command in `dropped_commands`."""
+    def __init__(self, max_size=None):
+        self.messages = collections.deque()
+        self.max_size = max_size
+        self.nb_dropped = 0
+        self.dropped_commands = collections.Counter()
+    def __len__(self):
+        return len(self.messages)
+    def append(self, message):
+        self.messages.append(message)
+        if self.max_size is not None and len(self.messages) > self.max_size:
+            dropped = self.messages.popleft()
+            self.nb_dropped += 1
+            self.dropped_commands[dropped.command] += 1
+    def popleft(self):
+        return self.messages.popleft()
+    def drain(self):
+        """Removes all messages, and returns them as a list."""
+        (messages, self.messages) = (list(self.messages), collections.deque())
+        return messages
 
 class ClientMock:
-    def __init__(self, name, show_io):
+    def __init__(self, name, show_io, namespace=None, max_inbox_size=None):
         self.name = name
         self.show_io = show_io
-        self.inbuffer = []
+        self.namespace = namespace # See irctest.irc_utils.namespacing
+        self.inbox = Inbox(max_inbox_size)
         self.ssl = False
     def connect(self, hostname, port):
         self.conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.conn.settimeout(1) # TODO: configurable
         self.conn.connect((hostname, port))
+        self.reader = framing.LineReader(self.conn)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.conn, selectors.EVENT_READ)
         if self.show_io:
             print('{:.3f} {}: connects to server.'.format(time.time(), self.name))
     def disconnect(self):
         if self.show_io:
             print('{:.3f} {}: disconnects from server.'.format(time.time(), self.name))
+        self.selector.close()
         self.conn.close()
     def starttls(self):
         assert not self.ssl, 'SSL already active.'
+        self.selector.unregister(self.conn)
         self.conn = ssl.wrap_socket(self.conn)
+        self.reader.sock = self.conn
+        self.selector.register(self.conn, selectors.EVENT_READ)
         self.ssl = True
+    def waitReadable(self, timeout=None):
+        """Waits until there is data to read from the server, or the
+        connection is closed, for up to `timeout` seconds (forever if None).
+        Returns whether there is."""
+        if self.ssl and self.conn.pending():
+            # Already decrypted, the socket itself may have nothing left
+            return True
+        return bool(self.selector.select(timeout))
     def getMessages(self, synchronize=True, assert_get_one=False):
-        if synchronize:
-            token = 'synchronize{}'.format(time.monotonic())
-            self.sendLine('PING {}'.format(token))
-        got_pong = False
-        data = b''
-        (self.inbuffer, messages) = ([], self.inbuffer)
-        conn = self.conn
+        """Receives messages, and returns them along with those that were
+        already in the inbox."""
+        self.receive(synchronize, assert_get_one)
+        return self.inbox.drain()
+    def receive(self, synchronize=True, assert_get_one=False):
+        """Receives messages into the inbox."""
+        with phases.phase('synchronization' if synchronize else 'receive'):
+            self._receive(synchronize, assert_get_one)
+    def _receive(self, synchronize, assert_get_one):
+        token = self.sendSynchronizationPing() if synchronize else None
+        reader = self.reader
+        deadline = time.monotonic() + RECEIVE_TIMEOUT
         try:
-            while not got_pong:
-                try:
-                    new_data = conn.recv(4096)
-                except socket.timeout:
-                    if not assert_get_one and not synchronize and data == b'':
+            while True:
+                if not assert_get_one and not synchronize and \
+                        not reader.has_partial_line():
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
                         # Received nothing
-                        return []
+                        return
+                    if not self.waitReadable(timeout):
+                        continue
+                elif not self.waitReadable(WAITING_REPORT_INTERVAL):
                     if self.show_io:
                         print('{:.3f} waiting…'.format(time.time()))
-                    time.sleep(0.1)
                     continue
-                except ConnectionResetError:
-                    raise ConnectionClosed()
-                else:
-                    if not new_data:
-                        # Connection closed
-                        raise ConnectionClosed()
-                data += new_data
-                if not new_data.endswith(b'\r\n'):
-                    time.sleep(0.1)
+                try:
+                    got_pong = self.receiveOnce(token)
+                except socket.timeout:
+                    # Part of a TLS record
                     continue
-                if not synchronize:
-                    got_pong = True
-                for line in data.decode().split('\r\n'):
-                    if line:
-                        if self.show_io:
-                            print('{time:.3f}{ssl} S -> {client}: {line}'.format(
-                                time=time.time(),
-                                ssl=' (ssl)' if self.ssl else '',
-                                client=self.name,
-                                line=line))
-                        message = message_parser.parse_message(line + '\r\n')
-                        if message.command == 'PONG' and \
-                                token in message.params:
-                            got_pong = True
-                        else:
-                            messages.append(message)
-                data = b''
+                if got_pong or \
+                        (not synchronize and not reader.has_partial_line()):
+                    return
         except ConnectionClosed:
-            if messages:
-                return messages
-            else:
+            if not self.inbox:
                 raise
-        else:
-            return messages
+    def sendSynchronizationPing(self):
+        """Sends a PING, and returns the token the server will reply with
+        when it processed everything sent before."""
+        token = 'synchronize{}'.format(time.monotonic())
+        self.sendLine('PING {}'.format(token))
+        return token
+    def receiveOnce(self, token=None):
+        """Receives data from the server once (waiting for it if there is
+        none), and puts the messages it completes in the inbox. Returns
+        whether they contained the reply to the synchronization PING with
+        the given token, which is not put in the inbox."""
+        try:
+            self.reader.receive()
+        except ConnectionResetError:
+            raise ConnectionClosed()
+        got_pong = False
+        while self.reader.lines:
+            line = self.reader.lines.popleft()
+            if line:
+                if self.show_io:
+                    print('{time:.3f}{ssl} S -> {client}: {line}'.format(
+                        time=time.time(),
+                        ssl=' (ssl)' if self.ssl else '',
+                        client=self.name,
+                        line=line))
+                message = message_parser.parse_message(line + '\r\n')
+                if self.namespace:
+                    message = self.namespace.unmangle_message(message)
+                if message.command == 'PONG' and token is not None and \
+                        token in message.params:
+                    got_pong = True
+                else:
+                    self.inbox.append(message)
+        return got_pong
+    def waitFor(self, predicate=None, timeout=WAIT_FOR_TIMEOUT):
+        """Returns the first message for which `predicate` returns True (or
+        the first message, if it is None) as soon as it is received,
+        without synchronizing with the server. Messages before it are
+        discarded.
+
+        Raises DeadlineExceeded if there is none after `timeout`
+        seconds."""
+        deadline = time.monotonic() + timeout
+        skipped = []
+        with phases.phase('receive'):
+            while True:
+                while self.inbox:
+                    message = self.inbox.popleft()
+                    if not predicate or predicate(message):
+                        return message
+                    skipped.append(message.command)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.waitReadable(remaining):
+                    raise DeadlineExceeded('Client {}: no expected message '
+                            'within {}s; received: {}'.format(
+                                self.name, timeout,
+                                ' '.join(skipped) or 'nothing'))
+                try:
+                    self.receiveOnce()
+                except socket.timeout:
+                    # Part of a TLS record
+                    pass
     def getMessage(self, filter_pred=None, synchronize=True):
         while True:
-            if not self.inbuffer:
-                self.inbuffer = self.getMessages(
-                        synchronize=synchronize, assert_get_one=True)
-            if not self.inbuffer:
+            if not self.inbox:
+                self.receive(synchronize=synchronize, assert_get_one=True)
+            if not self.inbox:
                 raise NoMessageException()
-            message = self.inbuffer.pop(0) # TODO: use dequeue
+            message = self.inbox.popleft()
             if not filter_pred or filter_pred(message):
                 return message
     def sendLine(self, line):
         if not line.endswith('\r\n'):
             line += '\r\n'
+        if self.namespace:
+            line = self.namespace.mangle_line(line)
         encoded_line = line.encode()
         try:
             ret = self.conn.sendall(encoded_line)
@@ -106,3 +208,44 @@ class ClientMock:
                 ssl=' (ssl)' if self.ssl else '',
                 client=self.name,
                 line=line.strip('\r\n')))
+
+def synchronize_all(clients, timeout=WAIT_FOR_TIMEOUT):
+    """Same as calling receive() on each client, but the synchronization
+    PINGs are all sent first, and their PONGs are waited for at the same
+    time.
+
+    Raises DeadlineExceeded if some clients got no PONG after `timeout`
+    seconds."""
+    tokens = {client: client.sendSynchronizationPing() for client in clients}
+    show_io = any(client.show_io for client in clients)
+    deadline = time.monotonic() + timeout
+    with selectors.DefaultSelector() as selector:
+        for client in clients:
+            selector.register(client.conn, selectors.EVENT_READ, client)
+        while tokens:
+            ready = [client for client in tokens
+                    if client.ssl and client.conn.pending()]
+            if not ready:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DeadlineExceeded('Clients {}: no reply to the '
+                            'synchronization PING within {}s'.format(
+                                ', '.join(str(client.name)
+                                    for client in tokens), timeout))
+                ready = [key.data for (key, events) in selector.select(
+                    min(remaining, WAITING_REPORT_INTERVAL))]
+                if not ready and show_io:
+                    print('{:.3f} waiting…'.format(time.time()))
+            for client in ready:
+                try:
+                    done = client.receiveOnce(tokens[client])
+                except socket.timeout:
+                    # Part of a TLS record
+                    continue
+                except ConnectionClosed:
+                    if not client.inbox:
+                        raise
+                    done = True
+                if done:
+                    del tokens[client]
+                    selector.unregister(client.conn)
@@ -2,9 +2,9 @@ import os
 import time
 import shutil
 import tempfile
-import subprocess
 
 from irctest import client_mock
+from irctest import readiness
 from irctest import authentication
 from irctest.basecontrollers import NotImplementedByController
 from irctest.basecontrollers import BaseServerController, DirectoryBasedController
@@ -27,6 +27,10 @@ auth {{
     flags = exceed_limit;
     {password_field}
 }};
+exempt {{
+    # All tests connect from there, possibly to the same server
+    ip = "127.0.0.1";
+}};
 channel {{
     disable_local_channels = no;
     no_create_on_split = no;
@@ -44,6 +48,8 @@ TEMPLATE_SSL_CONFIG = """
 
 class CharybdisController(BaseServerController, DirectoryBasedController):
     software_name = 'Charybdis'
+    software_executable = 'charybdis'
+    readiness_strategy = readiness.PidfileWatch('server.pid')
     supported_sasl_mechanisms = set()
     supported_capabilities = set()  # Not exhaustive
     def create_config(self):
@@ -76,12 +82,10 @@ class CharybdisController(BaseServerController, DirectoryBasedController):
                 password_field=password_field,
                 ssl_config=ssl_config,
                 ))
-        self.proc = subprocess.Popen(['charybdis', '-foreground',
+        self.proc = self.execute([self.software_executable, '-foreground',
             '-configfile', os.path.join(self.directory, 'server.conf'),
             '-pidfile', os.path.join(self.directory, 'server.pid'),
-            ],
-            stderr=subprocess.DEVNULL
-            )
+            ])
 
 
 def get_irctest_controller_class():
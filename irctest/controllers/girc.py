@@ -1,9 +1,9 @@
-import subprocess
-
+from irctest import processes
 from irctest.basecontrollers import BaseClientController, NotImplementedByController
 
 class GircController(BaseClientController):
     software_name = 'gIRC'
+    software_executable = 'girc_test'
     supported_sasl_mechanisms = ['PLAIN']
     supported_capabilities = set()  # Not exhaustive
 
@@ -14,19 +14,9 @@ class GircController(BaseClientController):
 
     def kill(self):
         if self.proc:
-            self.proc.terminate()
-            try:
-                self.proc.wait(5)
-            except subprocess.TimeoutExpired:
-                self.proc.kill()
+            processes.kill_tree(self.proc)
             self.proc = None
 
-    def __del__(self):
-        if self.proc:
-            self.proc.kill()
-        if self.directory:
-            self.directory.cleanup()
-
     def run(self, hostname, port, auth, tls_config):
         if tls_config:
             print(tls_config)
@@ -39,7 +29,7 @@ class GircController(BaseClientController):
             args += ['--sasl-fail-is-ok']
 
         # Runs a client with the config given as arguments
-        self.proc = subprocess.Popen(['girc_test', 'connect'] + args)
+        self.proc = self.execute([self.software_executable, 'connect'] + args)
 
 def get_irctest_controller_class():
     return GircController
@@ -2,9 +2,9 @@ import os
 import time
 import shutil
 import tempfile
-import subprocess
 
 from irctest import client_mock
+from irctest import readiness
 from irctest import authentication
 from irctest.basecontrollers import NotImplementedByController
 from irctest.basecontrollers import BaseServerController, DirectoryBasedController
@@ -42,6 +42,8 @@ TEMPLATE_SSL_CONFIG = """
 
 class HybridController(BaseServerController, DirectoryBasedController):
     software_name = 'Hybrid'
+    software_executable = 'ircd'
+    readiness_strategy = readiness.PidfileWatch('server.pid')
     supported_sasl_mechanisms = set()
     supported_capabilities = set()  # Not exhaustive
 
@@ -75,13 +77,10 @@ class HybridController(BaseServerController, DirectoryBasedController):
                 password_field=password_field,
                 ssl_config=ssl_config,
                 ))
-        self.proc = subprocess.Popen(['ircd', '-foreground',
+        self.proc = self.execute([self.software_executable, '-foreground',
             '-configfile', os.path.join(self.directory, 'server.conf'),
             '-pidfile', os.path.join(self.directory, 'server.pid'),
-            ],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-            )
+            ])
 
 
 def get_irctest_controller_class():
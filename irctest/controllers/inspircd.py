@@ -2,7 +2,6 @@ import os
 import time
 import shutil
 import tempfile
-import subprocess
 
 from irctest import authentication
 from irctest.basecontrollers import NotImplementedByController
@@ -19,7 +18,7 @@ TEMPLATE_CONFIG = """
 <connect allow="*"
     resolvehostnames="no" # Faster
     {password_field}>
-<log method="file" type="*" level="debug" target="/tmp/ircd-{port}.log">
+<log method="file" type="*" level="debug" target="{directory}/ircd.log">
 """
 
 TEMPLATE_SSL_CONFIG = """
@@ -29,6 +28,7 @@ TEMPLATE_SSL_CONFIG = """
 
 class InspircdController(BaseServerController, DirectoryBasedController):
     software_name = 'InspIRCd'
+    software_executable = 'inspircd'
     supported_sasl_mechanisms = set()
     supported_capabilities = set()  # Not exhaustive
 
@@ -58,15 +58,14 @@ class InspircdController(BaseServerController, DirectoryBasedController):
             ssl_config = ''
         with self.open_file('server.conf') as fd:
             fd.write(TEMPLATE_CONFIG.format(
+                directory=self.directory,
                 hostname=hostname,
                 port=port,
                 password_field=password_field,
                 ssl_config=ssl_config
                 ))
-        self.proc = subprocess.Popen(['inspircd', '--nofork', '--config',
-            os.path.join(self.directory, 'server.conf')],
-            stdout=subprocess.DEVNULL
-            )
+        self.proc = self.execute([self.software_executable, '--nofork', '--config',
+            os.path.join(self.directory, 'server.conf')])
 
 def get_irctest_controller_class():
     return InspircdController
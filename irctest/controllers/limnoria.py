@@ -1,5 +1,4 @@
 import os
-import subprocess
 
 from irctest import authentication
 from irctest import tls
@@ -28,6 +27,7 @@ supybot.networks.testnet.sasl.mechanisms: {mechanisms}
 
 class LimnoriaController(BaseClientController, DirectoryBasedController):
     software_name = 'Limnoria'
+    software_executable = 'supybot'
     supported_sasl_mechanisms = {
             'PLAIN', 'ECDSA-NIST256P-CHALLENGE', 'SCRAM-SHA-256', 'EXTERNAL',
             }
@@ -67,9 +67,8 @@ class LimnoriaController(BaseClientController, DirectoryBasedController):
                 enable_tls=tls_config.enable if tls_config else 'False',
                 trusted_fingerprints=' '.join(tls_config.trusted_fingerprints) if tls_config else '',
                 ))
-        self.proc = subprocess.Popen(['supybot',
-            os.path.join(self.directory, 'bot.conf')],
-            stderr=subprocess.STDOUT)
+        self.proc = self.execute([self.software_executable,
+            os.path.join(self.directory, 'bot.conf')])
 
 def get_irctest_controller_class():
     return LimnoriaController
@@ -1,7 +1,7 @@
 import os
 import time
-import subprocess
 
+from irctest import processes
 from irctest.basecontrollers import NotImplementedByController
 from irctest.basecontrollers import BaseServerController, DirectoryBasedController
 
@@ -63,6 +63,7 @@ def make_list(l):
 
 class MammonController(BaseServerController, DirectoryBasedController):
     software_name = 'Mammon'
+    software_executable = 'mammond'
     supported_sasl_mechanisms = {
             'PLAIN', 'ECDSA-NIST256P-CHALLENGE',
             }
@@ -75,7 +76,7 @@ class MammonController(BaseServerController, DirectoryBasedController):
 
     def kill_proc(self):
         # Mammon does not seem to handle SIGTERM very well
-        self.proc.kill()
+        processes.kill_tree(self.proc, timeout=0)
 
     def run(self, hostname, port, password=None, ssl=False,
             restricted_metadata_keys=(),
@@ -97,13 +98,14 @@ class MammonController(BaseServerController, DirectoryBasedController):
                 ))
         #with self.open_file('server.yml', 'r') as fd:
         #    print(fd.read())
-        self.proc = subprocess.Popen(['mammond', '--nofork', #'--debug',
+        self.proc = self.execute([self.software_executable, '--nofork', #'--debug',
             '--config', os.path.join(self.directory, 'server.yml')])
 
     def registerUser(self, case, username, password=None):
         # XXX: Move this somewhere else when
         # https://github.com/ircv3/ircv3-specifications/pull/152 becomes
         # part of the specification
+        self.dirty = True
         client = case.addClient(show_io=False)
         case.sendLine(client, 'CAP LS 302')
         case.sendLine(client, 'NICK registration_user')
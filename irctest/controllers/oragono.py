@@ -2,6 +2,8 @@ import os
 import time
 import subprocess
 
+from irctest import processes
+from irctest.snapshot import restore_snapshot
 from irctest.basecontrollers import NotImplementedByController
 from irctest.basecontrollers import BaseServerController, DirectoryBasedController
 
@@ -72,8 +74,14 @@ limits:
         rest: 2048
 """
 
+TEMPLATE_TLS_CONFIG = """tls-listeners:
+        ":{port}":
+            key: {key}
+            cert: {pem}"""
+
 class OragonoController(BaseServerController, DirectoryBasedController):
     software_name = 'Oragono'
+    software_executable = 'oragono'
     supported_sasl_mechanisms = {
             'PLAIN',
     }
@@ -85,7 +93,7 @@ class OragonoController(BaseServerController, DirectoryBasedController):
             pass
 
     def kill_proc(self):
-        self.proc.kill()
+        processes.kill_tree(self.proc, timeout=0)
 
     def run(self, hostname, port, password=None, ssl=False,
             restricted_metadata_keys=None,
@@ -101,7 +109,7 @@ class OragonoController(BaseServerController, DirectoryBasedController):
         if ssl:
             self.key_path = os.path.join(self.directory, 'ssl.key')
             self.pem_path = os.path.join(self.directory, 'ssl.pem')
-            tls_config = 'tls-listeners:\n        ":{port}":\n            key: {key}\n            cert: {pem}'.format(
+            tls_config = TEMPLATE_TLS_CONFIG.format(
                 port=port,
                 key=self.key_path,
                 pem=self.pem_path,
@@ -115,17 +123,38 @@ class OragonoController(BaseServerController, DirectoryBasedController):
                 port=port,
                 tls=tls_config,
                 ))
-        subprocess.call(['oragono', 'initdb',
-            '--conf', os.path.join(self.directory, 'server.yml'), '--quiet'])
-        subprocess.call(['oragono', 'mkcerts',
-            '--conf', os.path.join(self.directory, 'server.yml'), '--quiet'])
-        self.proc = subprocess.Popen(['oragono', 'run',
+        restore_snapshot(self, 'oragono', self.initialize, self.directory,
+                mutable_files=['ircd.db'])
+        self.proc = self.execute([self.software_executable, 'run',
             '--conf', os.path.join(self.directory, 'server.yml'), '--quiet'])
 
+    def initialize(self, directory):
+        """Creates an empty database and TLS certificates in the
+        directory."""
+        config_path = os.path.join(directory, 'init.yml')
+        with open(config_path, 'w') as fd:
+            fd.write(TEMPLATE_CONFIG.format(
+                directory=directory,
+                hostname='localhost',
+                port=6667,
+                tls=TEMPLATE_TLS_CONFIG.format(
+                    port=6697,
+                    key=os.path.join(directory, 'ssl.key'),
+                    pem=os.path.join(directory, 'ssl.pem'),
+                    ),
+                ))
+        # Raise on failure, so the broken directory is not snapshotted.
+        subprocess.check_call([self.software_executable, 'initdb',
+            '--conf', config_path, '--quiet'])
+        subprocess.check_call([self.software_executable, 'mkcerts',
+            '--conf', config_path, '--quiet'])
+        os.unlink(config_path)
+
     def registerUser(self, case, username, password=None):
         # XXX: Move this somewhere else when
         # https://github.com/ircv3/ircv3-specifications/pull/152 becomes
         # part of the specification
+        self.dirty = True
         client = case.addClient(show_io=False)
         case.sendLine(client, 'CAP LS 302')
         case.sendLine(client, 'NICK registration_user')
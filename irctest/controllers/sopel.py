@@ -1,7 +1,7 @@
 import os
 import tempfile
-import subprocess
 
+from irctest import processes
 from irctest.basecontrollers import BaseClientController
 from irctest.basecontrollers import NotImplementedByController
 
@@ -21,6 +21,7 @@ auth_password = {password}
 
 class SopelController(BaseClientController):
     software_name = 'Sopel'
+    software_executable = 'sopel'
     supported_sasl_mechanisms = {
             'PLAIN',
             }
@@ -32,7 +33,7 @@ class SopelController(BaseClientController):
         self.proc = None
     def kill(self):
         if self.proc:
-            self.proc.kill()
+            processes.kill_tree(self.proc, timeout=0)
         if self.filename:
             try:
                 os.unlink(os.path.join(os.path.expanduser('~/.sopel/'),
@@ -63,7 +64,7 @@ class SopelController(BaseClientController):
                 password=auth.password if auth else '',
                 auth_method='auth_method = sasl' if auth else '',
                 ))
-        self.proc = subprocess.Popen(['sopel', '--quiet', '-c', self.filename])
+        self.proc = self.execute([self.software_executable, '--quiet', '-c', self.filename])
 
 def get_irctest_controller_class():
     return SopelController
@@ -1,6 +1,15 @@
 class NoMessageException(AssertionError):
     pass
 
+class DeadlineExceeded(NoMessageException):
+    pass
+
 class ConnectionClosed(Exception):
     pass
 
+
+class ServerNotReady(Exception):
+    pass
+
+class NickTooLong(Exception):
+    pass
@@ -0,0 +1,103 @@
+"""Reuses results of tests whose inputs did not change since they last
+passed or were skipped.
+
+The inputs of a test are the tested software and its controller, the
+source file of the test (including its helpers and class attributes),
+the other files of irctest, and the command-line options that change how
+tests behave."""
+
+import os
+import hashlib
+import inspect
+import unittest
+
+from . import cache
+from . import runner
+from .parallel import RecordedTest
+
+# Outcomes that are replayed instead of running the test again
+REUSABLE_OUTCOMES = {'success', 'skip', 'expectedFailure'}
+
+def _harness_files():
+    """Returns the paths to the files of irctest, except test files (which
+    are fingerprinted with each of their tests)."""
+    root = os.path.dirname(__file__)
+    paths = []
+    for (directory, subdirectories, files) in os.walk(root):
+        paths.extend(os.path.join(directory, name) for name in files
+                if name.endswith('.py') and not name.startswith('test_'))
+    return sorted(paths)
+
+def test_fingerprint(test, base_fingerprint):
+    """Returns a string identifying the inputs of a test case."""
+    method = getattr(type(test), test._testMethodName)
+    h = hashlib.sha256(base_fingerprint.encode())
+    h.update(cache.file_fingerprint(
+        inspect.getsourcefile(type(test))).encode())
+    h.update(inspect.getsource(method).encode())
+    return h.hexdigest()
+
+class ResultCache:
+    """Results of the previous runs of each test."""
+    def __init__(self, controller_class, flags, path='results.json'):
+        controller = cache.controller_fingerprint(controller_class)
+        if controller is None:
+            # The software is not installed, nothing to reuse
+            self.base_fingerprint = None
+        else:
+            self.base_fingerprint = ':'.join([controller, repr(flags)] +
+                    [cache.file_fingerprint(harness_file)
+                        for harness_file in _harness_files()])
+        self.store = cache.JsonStore(path)
+        self.controller_name = '{}.{}'.format(
+                controller_class.__module__, controller_class.__qualname__)
+        self.results = self.store.get(self.controller_name, {})
+
+    def fingerprint(self, test):
+        if self.base_fingerprint is None:
+            return None
+        try:
+            return test_fingerprint(test, self.base_fingerprint)
+        except (AttributeError, TypeError, OSError):
+            # Not a regular test method, or its source is not available
+            return None
+
+    def replay_unchanged(self, suite):
+        """Returns a flat test suite where tests whose inputs did not
+        change since they last passed or were skipped are replaced with
+        their previous outcomes."""
+        tests = []
+        self.nb_reused = 0
+        for test in runner.iter_tests(suite):
+            previous = self.results.get(test.id())
+            if not runner.is_skipped_before_setup(test) \
+                    and previous is not None \
+                    and previous['fingerprint'] == self.fingerprint(test) \
+                    and all(outcome in REUSABLE_OUTCOMES
+                        for (outcome, detail) in previous['outcomes']):
+                test = RecordedTest.of_test(test,
+                        [tuple(outcome) for outcome in previous['outcomes']],
+                        previous['duration'])
+                self.nb_reused += 1
+            tests.append(test)
+        return unittest.TestSuite(tests)
+
+    def update(self, tests, result):
+        """Stores the outcomes of the tests that just ran. Those of tests
+        skipped before setUp are not, as they depend on the probe (which
+        may be disabled next time) and are cheap to compute again."""
+        for test in tests:
+            if isinstance(test, RecordedTest) \
+                    or runner.is_skipped_before_setup(test) \
+                    or test.id() not in result.test_outcomes:
+                continue
+            fingerprint = self.fingerprint(test)
+            if fingerprint is None:
+                continue
+            self.results[test.id()] = {
+                    'fingerprint': fingerprint,
+                    'outcomes': result.test_outcomes[test.id()],
+                    'duration': result.test_durations.get(test.id(), 0),
+                    }
+        self.store[self.controller_name] = self.results
+        self.store.save()
@@ -0,0 +1,79 @@
+"""
+Splits data received from a socket into lines, in time linear in the
+amount of data received.
+
+Data is received directly into a preallocated buffer, and complete lines
+are decoded as soon as their CR LF is received. Lines longer than the
+buffer are decoded incrementally, so a character split between two reads
+is still decoded correctly.
+"""
+
+import codecs
+import collections
+
+from ..exceptions import ConnectionClosed
+
+BUFFER_SIZE = 64*1024
+
+class LineReader:
+    """Reads CR LF-terminated lines from a socket, and returns them
+    decoded, without their CR LF."""
+    def __init__(self, sock, encoding='utf8', buffer_size=BUFFER_SIZE):
+        self.sock = sock # Can be replaced, eg. after STARTTLS
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.start = 0 # Start of the current line in the buffer
+        self.end = 0 # End of the data received in the buffer
+        self.decoder = codecs.getincrementaldecoder(encoding)()
+        self.line_start = [] # Decoded beginning of the current line
+        self.lines = collections.deque() # Complete lines, not read yet
+
+    def has_partial_line(self):
+        """Returns whether part of a line was received, and not its end."""
+        return bool(self.line_start) or self.start != self.end
+
+    def receive(self):
+        """Receives data from the socket once (blocking if the socket is),
+        and returns the number of lines it completed. They can then be
+        read with readline() or from the `lines` deque.
+
+        Raises ConnectionClosed if the server closed the connection."""
+        if self.end == len(self.buffer):
+            self._make_room()
+        nb_received = self.sock.recv_into(self.view[self.end:])
+        if not nb_received:
+            raise ConnectionClosed()
+        # The CR of a CR LF may be the last byte of previous data.
+        search_start = max(self.start, self.end - 1)
+        self.end += nb_received
+        nb_lines = 0
+        while True:
+            line_end = self.buffer.find(b'\r\n', search_start, self.end)
+            if line_end == -1:
+                return nb_lines
+            self.line_start.append(self.decoder.decode(
+                self.view[self.start:line_end], final=True))
+            self.lines.append(''.join(self.line_start))
+            self.line_start = []
+            nb_lines += 1
+            self.start = search_start = line_end + 2
+
+    def _make_room(self):
+        if self.start > 0:
+            # Move the current line to the beginning of the buffer.
+            data = bytes(self.view[self.start:self.end])
+            self.buffer[0:len(data)] = data
+            (self.start, self.end) = (0, len(data))
+        else:
+            # The current line fills the buffer. Decode all of it but its
+            # last byte, which may be the CR of its CR LF.
+            self.line_start.append(self.decoder.decode(
+                self.view[0:self.end-1]))
+            self.buffer[0] = self.buffer[self.end-1]
+            self.end = 1
+
+    def readline(self):
+        """Returns the next line, waiting for it if needed."""
+        while not self.lines:
+            self.receive()
+        return self.lines.popleft()
@@ -0,0 +1,140 @@
+"""
+Rewrites nicks and channel names, so tests using the same names can run
+at the same time on the same server.
+
+Outgoing lines get a suffix unique to the test appended to nicks and
+channel names, and incoming messages get it removed.
+"""
+
+import re
+import itertools
+
+from . import message_parser
+from ..exceptions import NickTooLong
+
+CHANNEL_PREFIXES = '#&'
+WILDCARDS = '*?!@'
+
+# For commands sent by clients, indexes of the parameters that are
+# (comma-separated lists of) nicks or channels. None means all of them.
+TARGET_PARAMS = {
+        'NICK': (0,),
+        'JOIN': (0,),
+        'PART': (0,),
+        'PRIVMSG': (0,),
+        'NOTICE': (0,),
+        'TAGMSG': (0,),
+        'KICK': (0, 1),
+        'INVITE': (0, 1),
+        'TOPIC': (0,),
+        'NAMES': (0,),
+        'LIST': (0,),
+        'WHO': (0,),
+        'WHOIS': None,
+        'WHOWAS': (0,),
+        'ISON': None,
+        'USERHOST': None,
+        'KILL': (0,),
+        'METADATA': (0,),
+        'MODE': (0,),
+        'MONITOR': (1,),
+        }
+
+# Maximum nick length guaranteed by RFC 1459, for servers whose NICKLEN
+# is unknown
+DEFAULT_NICKLEN = 9
+
+_counter = itertools.count(1)
+
+def _base36(n):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    s = ''
+    while n:
+        (n, d) = divmod(n, 36)
+        s = digits[d] + s
+    return s
+
+def _split_head(line):
+    """Splits a line into its tags, prefix, and command; and its
+    parameters."""
+    head = []
+    rest = line
+    if rest.startswith('@'):
+        (tags, rest) = rest.split(' ', 1)
+        head.append(tags)
+    rest = rest.lstrip(' ')
+    if rest.startswith(':'):
+        (prefix, rest) = rest.split(' ', 1)
+        head.append(prefix)
+    (command, rest) = (rest.lstrip(' ').split(' ', 1) + [''])[0:2]
+    head.append(command)
+    return (' '.join(head), ' ' + rest)
+
+class Namespace:
+    """Set of nicks and channel names of a test.
+
+    If `nicklen` is given, mangling a nick that would then be longer than
+    it raises NickTooLong, and sets `nick_too_long`."""
+    def __init__(self, nicklen=None):
+        # Short, to stay within servers' nick length limits.
+        self.suffix = '|' + _base36(next(_counter))
+        self.nicklen = nicklen
+        self.nick_too_long = False
+        self.nicks = set()
+        self._suffix_re = re.compile(
+                re.escape(self.suffix) + r'(?![^\s,!@:])')
+
+    def mangle(self, name, nick=False):
+        """Returns the name as sent to the server, if `name` is a channel
+        name, or a nick and `nick` is True."""
+        if not name or name == '*' or any(c in name for c in WILDCARDS):
+            return name
+        elif name[0] in CHANNEL_PREFIXES:
+            return name + self.suffix
+        elif nick:
+            if self.nicklen is not None and \
+                    len(name + self.suffix) > self.nicklen:
+                self.nick_too_long = True
+                raise NickTooLong(name + self.suffix)
+            self.nicks.add(name)
+            return name + self.suffix
+        else:
+            return name
+
+    def unmangle(self, s):
+        """Removes the suffix from all names in a string."""
+        return self._suffix_re.sub('', s)
+
+    def mangle_line(self, line):
+        """Rewrites a line sent by a client."""
+        msg = message_parser.parse_message(line if line.endswith('\r\n')
+                else line + '\r\n')
+        command = msg.command.upper()
+        indexes = TARGET_PARAMS.get(command, ())
+        if indexes is None:
+            indexes = range(len(msg.params))
+        params = list(msg.params)
+        for (i, param) in enumerate(params):
+            if i in indexes:
+                params[i] = ','.join(self.mangle(x, nick=True)
+                        for x in param.split(','))
+            elif command == 'MODE' and param in self.nicks:
+                # Parameter of a channel mode, eg. “MODE #chan +o foo”
+                params[i] = self.mangle(param, nick=True)
+        if params == msg.params:
+            return line
+        # Keep tags, prefix, and command as they were written.
+        (head, rest) = _split_head(line.rstrip('\r\n'))
+        if ' :' in rest:
+            params[-1] = ':' + params[-1]
+        return ' '.join([head] + params) + \
+                ('\r\n' if line.endswith('\r\n') else '')
+
+    def unmangle_message(self, msg):
+        """Rewrites a message received by a client."""
+        return message_parser.Message(
+                tags=msg.tags,
+                prefix=msg.prefix and self.unmangle(msg.prefix),
+                command=msg.command,
+                params=[self.unmangle(param) for param in msg.params],
+                )
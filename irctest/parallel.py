@@ -0,0 +1,224 @@
+"""Runs test cases concurrently, either in a pool of worker processes or
+in threads sharing the same server.
+
+Each worker process gets its own temporary directory, so controllers
+running in different workers do not step on each other.
+Outcomes are sent back to the parent process (or thread), which reports
+them to the usual test result, as if the tests ran there."""
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+import multiprocessing.util
+import concurrent.futures
+
+from . import cases
+from . import phases
+from . import reaper
+from . import runner
+from . import processes
+from . import server_pool
+
+class RecordingTestResult(runner.OutcomeRecorder, unittest.TestResult):
+    """Test result that stores outcomes as formatted strings, so they can
+    be sent to another process and replayed there."""
+    def __init__(self):
+        super().__init__()
+        self.outcomes = []
+        self.phase_durations = {}
+    def startTest(self, test):
+        phases.start_test()
+        super().startTest(test)
+    def stopTest(self, test):
+        super().stopTest(test)
+        self.phase_durations = phases.stop_test()
+    def recordOutcome(self, test, outcome, detail):
+        self.outcomes.append((outcome, detail))
+
+class RecordedTest:
+    """Stands for a test that ran somewhere else. Running it replays its
+    outcomes into the given result."""
+    def __init__(self, test_id, name, description, outcomes, duration,
+            phase_durations=None):
+        self.test_id = test_id
+        self.name = name
+        self._description = description
+        self.outcomes = outcomes
+        self.duration = duration
+        self.phase_durations = phase_durations
+
+    @classmethod
+    def of_test(cls, test, outcomes, duration, phase_durations=None):
+        if hasattr(test, 'description'):
+            description = test.description()
+        else:
+            description = test.shortDescription()
+        return cls(test.id(), str(test), description, outcomes, duration,
+                phase_durations)
+
+    def __str__(self):
+        return self.name
+    def id(self):
+        return self.test_id
+    def description(self):
+        return self._description
+    def shortDescription(self):
+        return (self._description or '').strip().split('\n')[0] or None
+    def countTestCases(self):
+        return 1
+
+    def __call__(self, result):
+        return self.run(result)
+    def run(self, result):
+        result.startTest(self)
+        for (outcome, detail) in self.outcomes:
+            if outcome == 'success':
+                result.addSuccess(self)
+            elif outcome == 'skip':
+                result.addSkip(self, detail)
+            elif outcome == 'failure':
+                result.addFailure(self, detail)
+            elif outcome == 'error':
+                result.addError(self, detail)
+            elif outcome == 'expectedFailure':
+                result.addExpectedFailure(self, detail)
+            elif outcome == 'unexpectedSuccess':
+                result.addUnexpectedSuccess(self)
+            else:
+                raise ValueError('Unknown outcome: {}'.format(outcome))
+        result.stopTest(self)
+        return result
+
+def record_test(test):
+    """Runs a test and returns a RecordedTest of its outcomes."""
+    result = RecordingTestResult()
+    start_time = time.monotonic()
+    test(result)
+    return RecordedTest.of_test(test, result.outcomes,
+            time.monotonic() - start_time, result.phase_durations)
+
+# Inherited by worker processes when they are forked.
+_tests = None
+
+def _init_worker(slot_counter, run_directory, prefetch):
+    with slot_counter.get_lock():
+        slot = slot_counter.value
+        slot_counter.value += 1
+    processes.reset_signals()
+    tempfile.tempdir = os.path.join(run_directory, 'worker-{}'.format(slot))
+    os.mkdir(tempfile.tempdir)
+    if cases.BaseServerTestCase.server_pool is not None:
+        # atexit handlers do not run in workers, but finalizers do when
+        # the pool is closed.
+        multiprocessing.util.Finalize(None,
+                cases.BaseServerTestCase.server_pool.close, exitpriority=10)
+    if prefetch:
+        cases.BaseServerTestCase.prefetcher = server_pool.ServerPrefetcher(
+                cases.BaseServerTestCase.controllerClass,
+                cases.BaseServerTestCase.port_broker, prefetch)
+        multiprocessing.util.Finalize(None,
+                cases.BaseServerTestCase.prefetcher.close, exitpriority=10)
+    # Runs after the previous ones, as they stop servers in the background.
+    multiprocessing.util.Finalize(None, reaper.wait, exitpriority=5)
+    multiprocessing.util.Finalize(None, processes.kill_remaining,
+            exitpriority=0)
+
+def _run_test(index):
+    return record_test(_tests[index])
+
+class ParallelTestSuite(unittest.TestSuite):
+    """Test suite that runs its tests in a pool of `jobs` worker
+    processes, and reports their outcomes to the result of the parent
+    process."""
+    def __init__(self, tests=(), jobs=1, prefetch=0):
+        super().__init__(tests)
+        self.jobs = jobs
+        self.prefetch = prefetch
+
+    def run(self, result, debug=False):
+        global _tests
+        _tests = list(runner.iter_tests(self))
+        context = multiprocessing.get_context('fork')
+        slot_counter = context.Value('i', 0)
+        run_directory = tempfile.mkdtemp(prefix='irctest-')
+        pool = context.Pool(self.jobs, initializer=_init_worker,
+                initargs=(slot_counter, run_directory, self.prefetch))
+        try:
+            for recorded_test in pool.imap_unordered(_run_test,
+                    range(len(_tests))):
+                recorded_test.run(result)
+                if result.shouldStop:
+                    pool.terminate()
+                    break
+            else:
+                pool.close()
+        except BaseException:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            shutil.rmtree(run_directory, ignore_errors=True)
+            _tests = None
+        return result
+
+class SharedServerTestSuite(unittest.TestSuite):
+    """Test suite that runs server tests in `threads` threads, all using
+    the same server. Nicks and channel names of each test are rewritten
+    so they do not collide with other tests' (see
+    irctest.irc_utils.namespacing).
+
+    Tests that cannot share their server run afterwards, one at a
+    time."""
+    def __init__(self, tests=(), threads=1):
+        super().__init__(tests)
+        self.threads = threads
+
+    def run(self, result, debug=False):
+        tests = list(runner.iter_tests(self))
+        shared = [test for test in tests
+                if isinstance(test, cases.BaseServerTestCase)
+                and test.isShareable()]
+        exclusive = [test for test in tests if test not in shared]
+        if shared:
+            try:
+                server = server_pool.ServerPool().acquire(shared[0])
+            except Exception:
+                # eg. the controller cannot run with the default
+                # parameters; let each test report it.
+                (shared, exclusive) = ([], tests)
+        if shared:
+            cases.BaseServerTestCase.shared_server = server
+            try:
+                exclusive = self._run_shared(shared, result) + exclusive
+            finally:
+                cases.BaseServerTestCase.shared_server = None
+                server.controller.kill()
+        for test in exclusive:
+            if result.shouldStop:
+                break
+            test(result)
+        return result
+
+    def _run_shared(self, tests, result):
+        """Runs the tests on the shared server, and returns those that
+        must run again on a server of their own."""
+        again = []
+        with concurrent.futures.ThreadPoolExecutor(self.threads) as executor:
+            futures = {executor.submit(record_test, test): test
+                    for test in tests}
+            for future in concurrent.futures.as_completed(futures):
+                test = futures[future]
+                namespace = getattr(test, 'namespace', None)
+                if namespace is not None and namespace.nick_too_long:
+                    # Its outcome is not meaningful.
+                    again.append(test)
+                    continue
+                future.result().run(result)
+                if result.shouldStop:
+                    for future in futures:
+                        future.cancel()
+                    break
+        return again
@@ -0,0 +1,107 @@
+"""Measures how long each phase of a test takes (starting the server,
+waiting for it to accept clients, registering clients, reading messages,
+the test itself, ...), to tell where the time of a run goes.
+
+Time spent in a phase nested in another one (eg. reading messages while
+registering a client) is only counted for the inner phase, so the
+durations of the phases of a test add up to (about) its duration.
+
+Each thread measures the test it is running, if any."""
+
+import time
+import threading
+import contextlib
+import collections
+
+# In the order they happen, and are displayed in.
+PHASES = ['setUp', 'server start', 'wait for port', 'registration',
+        'synchronization', 'receive', 'test', 'tearDown']
+
+_local = threading.local()
+
+def start_test():
+    """Starts measuring the phases of a test in the current thread, in
+    the 'setUp' phase."""
+    _local.durations = collections.defaultdict(float)
+    _local.stack = [('setUp', time.monotonic())]
+
+def stop_test():
+    """Stops measuring, and returns a dict of phase name -> seconds spent
+    in it since start_test()."""
+    durations = getattr(_local, 'durations', None)
+    if durations is None:
+        return {}
+    (current, start) = _local.stack[-1]
+    durations[current] += time.monotonic() - start
+    _local.durations = None
+    return dict(durations)
+
+@contextlib.contextmanager
+def phase(name):
+    """Counts the time spent in the block as spent in this phase, for the
+    test measured by the current thread (if any)."""
+    durations = getattr(_local, 'durations', None)
+    if durations is None:
+        yield
+        return
+    stack = _local.stack
+    now = time.monotonic()
+    if stack:
+        (outer_name, outer_start) = stack[-1]
+        durations[outer_name] += now - outer_start
+    stack.append((name, now))
+    try:
+        yield
+    finally:
+        now = time.monotonic()
+        (name, start) = stack.pop()
+        durations[name] += now - start
+        if stack:
+            # The outer phase resumes.
+            stack[-1] = (stack[-1][0], now)
+
+def switch(name):
+    """Ends the outermost phase of the test measured by the current
+    thread (if any), and starts this one instead. Must not be called
+    from inside a phase() block."""
+    if getattr(_local, 'durations', None) is None:
+        return
+    now = time.monotonic()
+    (current, start) = _local.stack[0]
+    _local.durations[current] += now - start
+    _local.stack[0] = (name, now)
+
+def _columns(test_phases):
+    names = set().union(*test_phases.values()) if test_phases else set()
+    return [name for name in PHASES if name in names] + \
+            sorted(names - set(PHASES))
+
+def print_test_phases(test_phases, file=None):
+    """Prints a table of the time spent in each phase (columns) by each
+    test (rows). `test_phases` is a dict of test id -> dict of phase
+    name -> seconds."""
+    columns = _columns(test_phases)
+    id_width = max([len('Test')] + list(map(len, test_phases)))
+    widths = [max(len(name), 7) for name in columns]
+    print(' '.join(['Test'.ljust(id_width)] + [name.rjust(width)
+        for (name, width) in zip(columns, widths)]), file=file)
+    for (test_id, durations) in sorted(test_phases.items()):
+        print(' '.join([test_id.ljust(id_width)] + [
+            '{:.3f}'.format(durations.get(name, 0)).rjust(width)
+            for (name, width) in zip(columns, widths)]), file=file)
+
+def print_aggregate(controller_name, test_phases, file=None):
+    """Prints the total time spent in each phase by all tests, and the
+    share of the total of all phases it is."""
+    totals = collections.defaultdict(float)
+    for durations in test_phases.values():
+        for (name, duration) in durations.items():
+            totals[name] += duration
+    total = sum(totals.values())
+    nb_tests = len(test_phases)
+    print('Time spent in each phase of {} test(s) with {}:'.format(
+        nb_tests, controller_name), file=file)
+    for name in _columns(test_phases):
+        print('\t{:<16} {:9.3f}s {:5.1f}% {:8.3f}s/test'.format(
+            name, totals[name], 100*totals[name]/total if total else 0,
+            totals[name]/nb_tests), file=file)
@@ -0,0 +1,50 @@
+"""Hands out ports for servers to listen on.
+
+A free port is found by binding to port 0, but it is free again as soon as
+that socket is closed, so another process (eg. another run of irctest)
+could take it before the server binds it. Instead, ports are reserved by
+leaving a connection to them in the TIME_WAIT state: the kernel does not
+give them to other sockets binding to port 0 until it expires, but servers
+(which set SO_REUSEADDR) can still bind them.
+
+Ports are also recorded in memory shared by all worker processes of a run,
+so they are never given twice during a run, even after TIME_WAIT
+expired."""
+
+import socket
+import contextlib
+import multiprocessing
+
+MAX_ATTEMPTS = 100
+
+def reserve_port(hostname=''):
+    """Returns (hostname, port) of a port reserved for a while."""
+    with contextlib.closing(socket.socket()) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind((hostname, 0))
+        s.listen(1)
+        sockname = s.getsockname()
+        with contextlib.closing(socket.socket()) as client:
+            client.connect(sockname)
+            (conn, _) = s.accept()
+            # The side that closes first keeps the port in TIME_WAIT.
+            conn.close()
+    return sockname
+
+class PortBroker:
+    """Reserves ports that were not given before by this broker, or the
+    brokers of processes forked after it was created."""
+    def __init__(self):
+        self.lock = multiprocessing.Lock()
+        self.used = multiprocessing.RawArray('B', 65536)
+
+    def reserve(self, hostname=''):
+        """Returns (hostname, port) of a port no one else should use."""
+        with self.lock:
+            for attempt in range(MAX_ATTEMPTS):
+                (hostname, port) = reserve_port(hostname)
+                if not self.used[port]:
+                    self.used[port] = 1
+                    return (hostname, port)
+        raise OSError('Could not find an unused port after {} attempts.'
+                .format(MAX_ATTEMPTS))
@@ -0,0 +1,51 @@
+"""Finds out which capabilities and ISUPPORT tokens a server advertises,
+by running it once with the default parameters.
+
+Results are cached for each build of the server, so tests requiring
+something the server does not advertise can be skipped without starting
+it."""
+
+import sys
+
+from . import cache
+from . import cases
+
+class _ProbeCase(cases.BaseServerTestCase):
+    def runTest(self):
+        self.addClient()
+        self.sendLine(1, 'CAP LS 302')
+        self.capabilities = self.getCapLs(1)
+        self.removeClient(1)
+        self.connectClient('probe')
+
+def probe_server():
+    """Runs the server of the current controller class, and returns the
+    dict of capabilities it advertises and the dict of its ISUPPORT
+    tokens."""
+    case = _ProbeCase()
+    case.setUp()
+    try:
+        case.runTest()
+    finally:
+        case.tearDown()
+    return (case.capabilities, case.server_support)
+
+def get_server_probe(controller_class):
+    """Returns the result of probe_server() for the given controller,
+    from the cache if the software did not change since it was last
+    probed. Returns None if the server could not be probed."""
+    key = cache.controller_fingerprint(controller_class)
+    if key is None:
+        return None
+    store = cache.JsonStore('probes.json')
+    if key not in store:
+        print('Probing {}…'.format(controller_class.software_name))
+        try:
+            (capabilities, isupport) = probe_server()
+        except Exception as e:
+            print('Could not probe {}: {!r}'.format(
+                controller_class.software_name, e), file=sys.stderr)
+            return None
+        store[key] = {'capabilities': capabilities, 'isupport': isupport}
+        store.save()
+    return (store[key]['capabilities'], store[key]['isupport'])
@@ -0,0 +1,238 @@
+"""Starts tested software, and makes sure it and everything it started
+are stopped.
+
+Software is started in a session of its own, so it and its descendants
+can be signaled as a whole even after some of them were reparented.
+Processes also inherit an environment variable identifying the run, so
+any that outlive their controller (eg. because a test crashed before
+stopping it, or a worker process was terminated) are found and killed
+when the run ends.
+
+Their output (stdout and stderr) is read by a background thread, which
+only keeps the end of it in memory, so it can be shown when a test fails
+without slowing down the run by printing it all."""
+
+import os
+import sys
+import signal
+import threading
+import subprocess
+
+import psutil
+
+RUN_ID_VARIABLE = 'IRCTEST_RUN_ID'
+
+# pid -> Popen of the software started by this process and not stopped yet
+_running = {}
+os.register_at_fork(after_in_child=_running.clear)
+
+OUTPUT_BUFFER_SIZE = 64*1024 # bytes, per process
+
+class OutputBuffer:
+    """Ring buffer of the last bytes written to a pipe, filled by a
+    background thread until the pipe is closed.
+
+    Bytes are written in place over the oldest ones, and only put back in
+    order by getvalue()."""
+    def __init__(self, pipe, size=OUTPUT_BUFFER_SIZE):
+        self.size = size
+        self.buffer = bytearray(size)
+        self.nb_written = 0
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._read, args=(pipe,),
+                name='irctest-output', daemon=True)
+        self.thread.start()
+
+    def _read(self, pipe):
+        with pipe:
+            while True:
+                chunk = os.read(pipe.fileno(), 4096)
+                if not chunk:
+                    break
+                with self.lock:
+                    self._write(chunk)
+
+    def _write(self, chunk):
+        if len(chunk) > self.size:
+            self.nb_written += len(chunk) - self.size
+            chunk = chunk[-self.size:]
+        index = self.nb_written % self.size
+        head = min(len(chunk), self.size - index)
+        self.buffer[index:index+head] = chunk[0:head]
+        self.buffer[0:len(chunk)-head] = chunk[head:]
+        self.nb_written += len(chunk)
+
+    def position(self):
+        """Returns the number of bytes written to the pipe so far."""
+        with self.lock:
+            return self.nb_written
+
+    def getvalue(self, start=0):
+        """Returns what was written after the first `start` bytes, or as
+        much of it as is still in the buffer."""
+        with self.lock:
+            if self.nb_written <= self.size:
+                nb_overwritten = 0
+                data = bytes(self.buffer[0:self.nb_written])
+            else:
+                nb_overwritten = self.nb_written - self.size
+                index = self.nb_written % self.size
+                data = bytes(self.buffer[index:] + self.buffer[0:index])
+        if start >= nb_overwritten:
+            data = data[start-nb_overwritten:]
+            nb_dropped = 0
+        else:
+            nb_dropped = nb_overwritten - start
+        text = data.decode(errors='replace')
+        if nb_dropped:
+            # Do not start in the middle of a line
+            text = '[{} bytes dropped]\n{}'.format(nb_dropped,
+                    text.partition('\n')[2])
+        return text
+
+def spawn(args, **kwargs):
+    """Same as subprocess.Popen, in a new session. Unless they are
+    redirected elsewhere, its stdout and stderr are kept in an
+    OutputBuffer, as `proc.output`."""
+    kwargs.setdefault('stdout', subprocess.PIPE)
+    kwargs.setdefault('stderr', subprocess.STDOUT)
+    proc = subprocess.Popen(args, start_new_session=True, **kwargs)
+    # Unlike its pid, it does not refer to another process if this one
+    # exited and was reaped.
+    proc.process = psutil.Process(proc.pid)
+    if proc.stdout is not None:
+        proc.output = OutputBuffer(proc.stdout)
+    else:
+        proc.output = None
+    _running[proc.pid] = proc
+    return proc
+
+def captured_output(proc, start=0):
+    """Returns what a process started by spawn() wrote so far, after the
+    first `start` bytes, or None if its output was not captured."""
+    output = getattr(proc, 'output', None)
+    if output is None:
+        return None
+    if proc.poll() is not None:
+        # Let the reader catch up with what it wrote before exiting.
+        output.thread.join(timeout=1)
+    return output.getvalue(start)
+
+def output_position(proc):
+    """Returns how many bytes a process started by spawn() wrote so far,
+    or 0 if its output was not captured."""
+    output = getattr(proc, 'output', None)
+    if output is None:
+        return 0
+    return output.position()
+
+def _describe(procs):
+    descriptions = []
+    for p in procs:
+        try:
+            descriptions.append((p.pid, ' '.join(p.cmdline())))
+        except psutil.Error:
+            pass # Already exited
+    return descriptions
+
+def _tree(proc):
+    """Returns the process and its descendants, or an empty list if it
+    already exited and was reaped (its pid may then belong to another
+    process)."""
+    if proc.poll() is not None:
+        return []
+    try:
+        return [proc.process] + proc.process.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return []
+
+def _signal_tree(proc, sig):
+    """Sends a signal to the process, its descendants, and the other
+    processes of its session; and returns the ones that were found."""
+    procs = _tree(proc)
+    if procs or not psutil.pid_exists(proc.pid):
+        # Its session is also its process group. Its id cannot be given
+        # to a new process while processes of the session are left, so
+        # if there is one, they all exited.
+        try:
+            os.killpg(proc.pid, sig)
+        except (ProcessLookupError, PermissionError):
+            pass # All exited
+    for p in procs:
+        try:
+            p.send_signal(sig)
+        except psutil.NoSuchProcess:
+            pass
+    return procs
+
+def kill_tree(proc, timeout=5):
+    """Terminates a process started by spawn() and its descendants, waits
+    up to `timeout` seconds (forever if None) for them to exit, and kills
+    the ones that did not. If `timeout` is 0, kills them right away."""
+    procs = _signal_tree(proc,
+            signal.SIGKILL if timeout == 0 else signal.SIGTERM)
+    (gone, alive) = psutil.wait_procs(procs, timeout=timeout)
+    if alive:
+        _signal_tree(proc, signal.SIGKILL)
+        psutil.wait_procs(alive, timeout=5)
+    proc.wait()
+    _running.pop(proc.pid, None)
+
+def _kill_running():
+    killed = []
+    for proc in list(_running.values()):
+        killed.extend(_describe(_tree(proc)))
+        kill_tree(proc, timeout=0)
+    return killed
+
+def kill_remaining():
+    """Kills the software started by this process that was not stopped,
+    and reports it."""
+    report_killed(_kill_running())
+
+def start_run():
+    """Marks the current process as the root of a run: all processes
+    started after this by it or its children can be killed by kill_run()
+    when it exits."""
+    os.environ[RUN_ID_VARIABLE] = '{}-{}'.format(
+            os.getpid(), psutil.Process().create_time())
+    for signum in (signal.SIGTERM, signal.SIGHUP):
+        # Exit normally, so finalizers and atexit handlers run.
+        signal.signal(signum, lambda signum, frame: sys.exit(128 + signum))
+
+def reset_signals():
+    """Restores the default handlers of the signals start_run() handles,
+    for child processes that should just die when terminated."""
+    for signum in (signal.SIGTERM, signal.SIGHUP):
+        signal.signal(signum, signal.SIG_DFL)
+
+def kill_run():
+    """Kills all processes started during the run that are still running,
+    and reports them."""
+    killed = _kill_running()
+    run_id = os.environ.get(RUN_ID_VARIABLE)
+    procs = []
+    for p in psutil.process_iter():
+        if p.pid == os.getpid():
+            continue
+        try:
+            if p.environ().get(RUN_ID_VARIABLE) == run_id:
+                procs.append(p)
+        except psutil.Error:
+            pass # Exited, or not ours
+    killed.extend(_describe(procs))
+    for p in procs:
+        try:
+            p.kill()
+        except psutil.NoSuchProcess:
+            pass
+    psutil.wait_procs(procs, timeout=5)
+    report_killed(killed)
+
+def report_killed(killed):
+    if not killed:
+        return
+    print('{} process(es) started by irctest were still running, and were '
+            'killed:'.format(len(killed)), file=sys.stderr)
+    for (pid, cmdline) in killed:
+        print('\t{}: {}'.format(pid, cmdline), file=sys.stderr)
@@ -0,0 +1,79 @@
+"""Ways of waiting for a server to be ready to accept clients.
+
+All of them poll with an exponential backoff, so the wait is close to the
+time the server actually takes to start, and fail as soon as the server
+exits instead of waiting forever."""
+
+import os
+import time
+import socket
+
+import psutil
+
+from .exceptions import ServerNotReady
+
+FIRST_DELAY = 0.001
+MAX_DELAY = 0.1
+TIMEOUT = 60
+
+class _Strategy:
+    def is_ready(self, controller, hostname):
+        raise NotImplementedError()
+
+    def wait(self, controller, hostname):
+        """Returns when the server of the controller is ready, or raises
+        ServerNotReady if it exited or takes too long."""
+        delay = FIRST_DELAY
+        deadline = time.monotonic() + TIMEOUT
+        while True:
+            returncode = controller.proc.poll()
+            if returncode is not None:
+                raise ServerNotReady('{} exited with code {}.'.format(
+                    controller.software_name, returncode))
+            if self.is_ready(controller, hostname):
+                return
+            if time.monotonic() > deadline:
+                raise ServerNotReady('{} did not listen on port {} within '
+                        '{} seconds.'.format(controller.software_name,
+                            controller.port, TIMEOUT))
+            time.sleep(delay)
+            delay = min(delay*2, MAX_DELAY)
+
+class ConnectProbe(_Strategy):
+    """Ready when a connection to the server's port succeeds."""
+    def is_ready(self, controller, hostname):
+        try:
+            socket.create_connection((hostname, controller.port),
+                    timeout=1).close()
+        except OSError:
+            return False
+        else:
+            return True
+
+class ListenWatch(_Strategy):
+    """Ready when the server process listens on its port. Unlike
+    ConnectProbe, this does not connect, so it does not count against
+    servers' reconnection throttling."""
+    def is_ready(self, controller, hostname):
+        try:
+            connections = psutil.Process(controller.proc.pid).connections()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            # Exited since the last poll() (which wait() then reports),
+            # or cannot be inspected.
+            return False
+        for conn in connections:
+            if conn.laddr[1] == controller.port \
+                    and conn.status == psutil.CONN_LISTEN:
+                return True
+        return False
+
+class PidfileWatch(ListenWatch):
+    """Ready when the server wrote its pidfile (with the given name, in its
+    directory) and listens on its port. Checking the pidfile first is
+    cheaper than listing the process' connections while it starts."""
+    def __init__(self, filename):
+        self.filename = filename
+
+    def is_ready(self, controller, hostname):
+        return os.path.exists(os.path.join(controller.directory,
+            self.filename)) and super().is_ready(controller, hostname)
@@ -0,0 +1,63 @@
+"""Stops tested software and removes its directory in background threads,
+so tests do not wait for it to exit.
+
+There is a bound on how many can be stopping at the same time; stopping
+more waits until one is done."""
+
+import os
+import sys
+import threading
+# Not “import concurrent.futures”, which imports it lazily, and that fails
+# if the first use is while the interpreter exits.
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_PENDING = 16
+NB_THREADS = 4
+
+class Reaper:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(NB_THREADS,
+                thread_name_prefix='irctest-reaper')
+        self.pending = threading.BoundedSemaphore(MAX_PENDING)
+
+    def submit(self, f, *args):
+        """Calls f(*args) in a background thread."""
+        self.pending.acquire()
+        try:
+            future = self.executor.submit(f, *args)
+        except RuntimeError:
+            # Already shut down, eg. because the interpreter is exiting
+            self.pending.release()
+            f(*args)
+        else:
+            future.add_done_callback(self._done)
+
+    def _done(self, future):
+        self.pending.release()
+        if future.exception() is not None:
+            print('Error while stopping software: {!r}'.format(
+                future.exception()), file=sys.stderr)
+
+    def wait(self):
+        """Waits for everything submitted so far to be done. Anything
+        submitted after this is done synchronously."""
+        self.executor.shutdown(wait=True)
+
+_reaper = None
+_reaper_pid = None
+_reaper_lock = threading.Lock()
+
+def get_reaper():
+    """Returns the reaper of the current process. Threads are not copied
+    to forked processes, so they do not share their parent's."""
+    global _reaper, _reaper_pid
+    with _reaper_lock:
+        if _reaper_pid != os.getpid():
+            _reaper = Reaper()
+            _reaper_pid = os.getpid()
+        return _reaper
+
+def wait():
+    """Waits for everything the current process submitted to be done."""
+    if _reaper_pid == os.getpid():
+        _reaper.wait()
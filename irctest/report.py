@@ -0,0 +1,111 @@
+"""Machine-readable results of a run, and merging results of several runs
+(eg. shards of the test suite running on different machines) into a
+single report."""
+
+import sys
+import json
+import argparse
+import unittest
+
+from . import runner
+from .parallel import RecordedTest
+
+def write_results(path, software_name, tests, result):
+    """Writes the outcomes of the given tests, that ran with this result,
+    to a JSON file."""
+    records = []
+    for test in tests:
+        if test.id() not in result.test_outcomes:
+            # Not run, eg. because of --failfast
+            continue
+        if hasattr(test, 'description'):
+            description = test.description()
+        else:
+            description = test.shortDescription()
+        records.append({
+            'id': test.id(),
+            'name': str(test),
+            'description': description,
+            'outcomes': result.test_outcomes[test.id()],
+            'duration': result.test_durations.get(test.id(), 0),
+            })
+    with open(path, 'w') as fd:
+        json.dump({'software': software_name, 'tests': records}, fd,
+                indent=1)
+
+def read_results(path):
+    """Returns the software name and list of RecordedTest in a file
+    written by write_results()."""
+    with open(path) as fd:
+        data = json.load(fd)
+    return (data['software'], [
+        RecordedTest(record['id'], record['name'], record['description'],
+            [tuple(outcome) for outcome in record['outcomes']],
+            record['duration'])
+        for record in data['tests']])
+
+def merge(argv):
+    parser = argparse.ArgumentParser(prog='python3 -m irctest merge',
+            description='Reports the results of several runs, eg. of '
+            'different shards, as if they were a single run.')
+    parser.add_argument('results', type=str, nargs='+',
+            help='Files written by --results.')
+    parser.add_argument('-v', '--verbose', action='count', default=1,
+            help='Verbosity. Give this option multiple times to make '
+            'it even more verbose.')
+    args = parser.parse_args(argv)
+
+    tests = {}
+    software_names = set()
+    for path in args.results:
+        (software_name, recorded_tests) = read_results(path)
+        software_names.add(software_name)
+        for test in recorded_tests:
+            if test.id() in tests:
+                print('{} is in several result files.'.format(test.id()),
+                        file=sys.stderr)
+            tests[test.id()] = test
+    print('Merging results of {} on {} test(s).'.format(
+        ', '.join(sorted(software_names)), len(tests)))
+    testRunner = runner.TextTestRunner(
+            verbosity=args.verbose,
+            descriptions=True,
+            )
+    result = testRunner.run(unittest.TestSuite(
+        test for (test_id, test) in sorted(tests.items())))
+    if result.failures or result.errors:
+        exit(1)
+    else:
+        exit(0)
+
+def outcome_label(outcomes):
+    """Summarizes the outcomes of a test in a word."""
+    kinds = {outcome for (outcome, detail) in outcomes}
+    if 'error' in kinds:
+        return 'ERROR'
+    elif kinds & {'failure', 'unexpectedSuccess'}:
+        return 'FAIL'
+    elif 'skip' in kinds:
+        return 'skip'
+    else:
+        return 'pass'
+
+def print_matrix(columns):
+    """Prints a table of the outcome of each test (rows) with each software
+    (columns). `columns` is a list of (software_name, tests) pairs, where
+    tests is a list of RecordedTest, or None if the software could not
+    be tested."""
+    labels = [{test.id(): outcome_label(test.outcomes) for test in tests}
+            if tests is not None else None
+            for (software_name, tests) in columns]
+    test_ids = sorted(set().union(*filter(None, labels)))
+    id_width = max(map(len, test_ids), default=0)
+    widths = [max(len(software_name), len('ERROR'))
+            for (software_name, tests) in columns]
+    print(' '.join(['Test'.ljust(id_width)] + [software_name.ljust(width)
+        for ((software_name, tests), width) in zip(columns, widths)]))
+    for test_id in test_ids:
+        print(' '.join([test_id.ljust(id_width)] + [
+            ('?' if column is None else column.get(test_id, '-'))
+            .ljust(width)
+            for (column, width) in zip(labels, widths)]))
@@ -1,7 +1,11 @@
+import time
 import unittest
 import operator
+import functools
 import collections
 
+from . import phases
+
 class NotImplementedByController(unittest.SkipTest, NotImplementedError):
     def __str__(self):
         return 'Not implemented by controller: {}'.format(self.args[0])
@@ -31,7 +35,121 @@ class SkipStrictTest(unittest.SkipTest):
     def __str__(self):
         return 'Tests not required because strict tests are disabled.'
 
-class TextTestResult(unittest.TextTestResult):
+def iter_tests(suite):
+    """Recursively yields the test cases contained in a test suite."""
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iter_tests(test)
+        else:
+            yield test
+
+def skip_before_setup(test, reason):
+    """Makes a test case report itself as skipped with the given reason,
+    without calling its setUp (so without starting any software)."""
+    method = getattr(test, test._testMethodName)
+    @functools.wraps(method)
+    def skipped(*args, **kwargs):
+        raise unittest.SkipTest(reason)
+    skipped.__unittest_skip__ = True
+    skipped.__unittest_skip_why__ = reason
+    setattr(test, test._testMethodName, skipped)
+
+def skip_unmet_requirements(suite):
+    """Marks tests whose requirements are known not to be met (see
+    irctest.cases._IrcTestCase.checkRequirements) as skipped, so they do
+    not start the tested software only to skip."""
+    for test in iter_tests(suite):
+        check_requirements = getattr(test, 'checkRequirements', None)
+        if check_requirements is None:
+            continue
+        try:
+            check_requirements()
+        except unittest.SkipTest as e:
+            skip_before_setup(test, str(e))
+        except Exception:
+            # Let the test run, and report the error if it happens again.
+            pass
+
+def is_skipped_before_setup(test):
+    """Returns whether skip_before_setup() (or unittest.skip) was applied
+    to the test."""
+    method = getattr(test, getattr(test, '_testMethodName', ''), None)
+    return getattr(method, '__unittest_skip__', False)
+
+class OutcomeRecorder:
+    """Mixin for test results, that calls self.recordOutcome(test,
+    outcome, detail) for each outcome of a test, with the details
+    (tracebacks and skip reasons) formatted as strings.
+
+    The output of the tested software is appended to the details of
+    failures and errors."""
+    def _exc_info_to_string(self, err, test):
+        if isinstance(err, str):
+            # Already formatted, eg. by a worker process.
+            return err
+        return super()._exc_info_to_string(err, test)
+    def _appendOutput(self, test, errors):
+        get_output = getattr(test, 'capturedOutput', None)
+        output = get_output() if get_output else None
+        if output:
+            (test, detail) = errors[-1]
+            errors[-1] = (test, '{}\nOutput of the tested software:\n{}'
+                    .format(detail, output))
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.recordOutcome(test, 'success', None)
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._appendOutput(test, self.errors)
+        self.recordOutcome(test, 'error', self.errors[-1][1])
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._appendOutput(test, self.failures)
+        self.recordOutcome(test, 'failure', self.failures[-1][1])
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is None:
+            pass
+        elif issubclass(err[0], test.failureException):
+            self._appendOutput(test, self.failures)
+            self.recordOutcome(test, 'failure', self.failures[-1][1])
+        else:
+            self._appendOutput(test, self.errors)
+            self.recordOutcome(test, 'error', self.errors[-1][1])
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.recordOutcome(test, 'skip', reason)
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.recordOutcome(test, 'expectedFailure',
+                self.expectedFailures[-1][1])
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.recordOutcome(test, 'unexpectedSuccess', None)
+
+class TextTestResult(OutcomeRecorder, unittest.TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.test_durations = {} # test id -> seconds
+        self.test_outcomes = collections.defaultdict(list)
+        self.test_phases = {} # test id -> phase name -> seconds
+    def recordOutcome(self, test, outcome, detail):
+        self.test_outcomes[test.id()].append((outcome, detail))
+    def startTest(self, test):
+        self._test_start_time = time.monotonic()
+        phases.start_test()
+        super().startTest(test)
+    def stopTest(self, test):
+        super().stopTest(test)
+        test_phases = phases.stop_test()
+        # Tests that ran in another process know their own phases and
+        # duration.
+        self.test_phases[test.id()] = getattr(test, 'phase_durations',
+                None) or test_phases
+        duration = getattr(test, 'duration', None)
+        if duration is None:
+            duration = time.monotonic() - self._test_start_time
+        self.test_durations[test.id()] = duration
     def getDescription(self, test):
         if hasattr(test, 'description'):
             doc_first_lines = test.description()
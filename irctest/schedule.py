@@ -0,0 +1,103 @@
+"""Orders tests using how long they took in previous runs.
+
+Running the longest tests first, and spreading them so each worker gets
+about the same total duration, avoids ending a concurrent run with a
+single worker still busy with a long test."""
+
+import heapq
+import unittest
+
+from . import cache
+from . import runner
+from .parallel import RecordedTest
+
+# Estimated duration of tests that never ran, when no test ever ran.
+DEFAULT_DURATION = 1.0
+
+class TimingStore:
+    """Durations of the tests of a software, from previous runs."""
+    def __init__(self, software_name, path='timings.json'):
+        self.software_name = software_name
+        self.store = cache.JsonStore(path)
+        self.durations = self.store.get(software_name, {})
+
+    def estimate(self, test):
+        """Returns how long the test is expected to take, in seconds."""
+        if runner.is_skipped_before_setup(test):
+            return 0
+        return self.recorded_estimate(test)
+
+    def recorded_estimate(self, test):
+        """Same as `estimate`, but only from the durations of previous runs,
+        so it does not depend on this machine's probe cache."""
+        if test.id() in self.durations:
+            return self.durations[test.id()]
+        elif self.durations:
+            # Average of known tests
+            return sum(self.durations.values()) / len(self.durations)
+        else:
+            return DEFAULT_DURATION
+
+    def update(self, durations):
+        """Records durations of tests (as a dict from test ids to
+        seconds) that just ran."""
+        self.durations.update(durations)
+        self.store[self.software_name] = self.durations
+        self.store.save()
+
+    def record_run(self, tests, result):
+        """Records durations of the tests that just ran. Tests skipped
+        before setUp, and tests whose results were reused from a previous
+        run, are ignored, as they did not take as long as running them
+        does."""
+        self.update({test.id(): result.test_durations[test.id()]
+            for test in tests
+            if test.id() in result.test_durations
+            and not isinstance(test, RecordedTest)
+            and not runner.is_skipped_before_setup(test)})
+
+    def longest_first(self, suite):
+        """Returns a flat test suite with the tests of the given suite, from
+        the longest to the shortest."""
+        tests = sorted(runner.iter_tests(suite),
+                key=lambda test: (-self.estimate(test), test.id()))
+        return unittest.TestSuite(tests)
+
+    def bin_pack(self, tests, nb_bins, estimate=None):
+        """Splits tests into `nb_bins` lists with about the same total
+        estimated duration, by giving each test (longest first) to the
+        list with the lowest total so far. Durations are given by
+        `estimate`, which defaults to `self.estimate`.
+
+        Returns a list of (total_duration, tests) pairs."""
+        estimate = estimate or self.estimate
+        bins = [(0, i, []) for i in range(nb_bins)]
+        for test in sorted(tests,
+                key=lambda test: (-estimate(test), test.id())):
+            (total, i, bin_tests) = heapq.heappop(bins)
+            bin_tests.append(test)
+            heapq.heappush(bins, (total + estimate(test), i, bin_tests))
+        return [(total, bin_tests) for (total, i, bin_tests) in sorted(
+            bins, key=lambda bin_: bin_[1])]
+
+    def estimate_duration(self, suite, nb_workers):
+        """Returns how long running the suite should take with this many
+        workers each picking the next test when they are done."""
+        bins = self.bin_pack(list(runner.iter_tests(suite)), nb_workers)
+        return max(total for (total, tests) in bins)
+
+def shard(suite, index, nb_shards, timings=None):
+    """Returns a flat test suite with the tests of the `index`-th (starting
+    from 1) of `nb_shards` parts of the suite.
+
+    The split only depends on test ids, or on test ids and recorded
+    durations if a TimingStore is given (not on which tests this machine
+    would skip), so it is the same on all machines given the same tests
+    (and timings)."""
+    tests = sorted(runner.iter_tests(suite), key=lambda test: test.id())
+    if timings is None:
+        shard_tests = tests[index-1::nb_shards]
+    else:
+        (total, shard_tests) = timings.bin_pack(tests, nb_shards,
+                timings.recorded_estimate)[index-1]
+    return unittest.TestSuite(shard_tests)
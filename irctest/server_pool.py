@@ -0,0 +1,110 @@
+"""Keeps servers running between tests, instead of starting a new one for
+each test.
+
+Servers are reused by tests that start them with the same parameters,
+unless a test marked its server as dirty (eg. because it registered an
+account) or the server exited.
+
+Alternatively, servers with the default parameters can be started in
+advance, while other tests run, and be used by a single test each."""
+
+import collections
+import concurrent.futures
+
+PooledServer = collections.namedtuple('PooledServer',
+        'controller hostname port')
+
+class ServerPool:
+    def __init__(self):
+        self.servers = {} # signature -> PooledServer
+
+    @staticmethod
+    def _signature(parameters):
+        return tuple(sorted(
+            (key, frozenset(value) if isinstance(value, (set, frozenset))
+                else value)
+            for (key, value) in parameters.items()))
+
+    def acquire(self, case):
+        """Returns a PooledServer running with the test case's parameters,
+        starting one if there is none."""
+        parameters = case.server_parameters()
+        server = self.servers.pop(self._signature(parameters), None)
+        if server is not None and server.controller.proc.poll() is not None:
+            server.controller.kill()
+            server = None
+        if server is None:
+            controller = case.controllerClass()
+            case.find_hostname_and_port()
+            controller.run(case.hostname, case.port, **parameters)
+            server = PooledServer(controller, case.hostname, case.port)
+        return server
+
+    def release(self, case):
+        """Gives the server of the test case back to the pool, or stops it
+        if it cannot be reused."""
+        controller = case.controller
+        if controller.dirty or controller.proc.poll() is not None:
+            controller.kill()
+            return
+        signature = self._signature(case.server_parameters())
+        previous = self.servers.get(signature)
+        if previous is not None:
+            previous.controller.kill()
+        self.servers[signature] = PooledServer(
+                controller, case.hostname, case.port)
+
+    def close(self):
+        """Stops all servers in the pool."""
+        while self.servers:
+            (signature, server) = self.servers.popitem()
+            server.controller.kill()
+
+class ServerPrefetcher:
+    """Keeps `size` servers with the default parameters starting in the
+    background, so tests can take one that is already running instead of
+    waiting for one to start."""
+    def __init__(self, controller_class, port_broker, size):
+        self.controller_class = controller_class
+        self.port_broker = port_broker
+        self.executor = concurrent.futures.ThreadPoolExecutor(size,
+                thread_name_prefix='irctest-prefetch')
+        self.queue = collections.deque(self._prefetch() for i in range(size))
+
+    def _prefetch(self):
+        return self.executor.submit(self._start)
+
+    def _start(self):
+        controller = self.controller_class()
+        (hostname, port) = self.port_broker.reserve()
+        controller.run(hostname, port)
+        try:
+            controller.wait_for_port(hostname)
+        except Exception:
+            controller.kill()
+            raise
+        return PooledServer(controller, hostname, port)
+
+    def acquire(self):
+        """Returns a PooledServer that is ready to accept clients, and
+        starts another one in its place. Raises the exception that
+        starting it raised, if any.
+
+        Servers that exited since they started are stopped and replaced;
+        if all of them did, one is started in the foreground."""
+        for i in range(len(self.queue)):
+            future = self.queue.popleft()
+            self.queue.append(self._prefetch())
+            server = future.result()
+            if server.controller.proc.poll() is None:
+                return server
+            server.controller.kill()
+        return self._start()
+
+    def close(self):
+        """Stops all servers that were not taken."""
+        while self.queue:
+            future = self.queue.popleft()
+            if not future.cancel() and future.exception() is None:
+                future.result().controller.kill()
+        self.executor.shutdown()
@@ -28,6 +28,7 @@ class AccountTagTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
     @cases.OptionalityHelper.skipUnlessHasMechanism('PLAIN')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('account-tag')
     def testPrivmsg(self):
         self.connectClient('foo', capabilities=['account-tag'],
                 skip_if_cap_nak=True)
@@ -51,6 +52,8 @@ class AccountTagTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
     @cases.OptionalityHelper.skipUnlessHasMechanism('PLAIN')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('account-tag')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitor(self):
         self.connectClient('foo', capabilities=['account-tag'],
                 skip_if_cap_nak=True)
@@ -239,6 +239,7 @@ class JoinTestCase(cases.BaseServerTestCase):
         self.assertIn(m.command, ('403', '443'))
 
     @cases.SpecificationSelector.requiredBySpecification('RFC1459', 'RFC2812')
+    @cases.OptionalityHelper.needsExclusiveServer
     def testListEmpty(self):
         """<https://tools.ietf.org/html/rfc1459#section-4.2.6>
         <https://tools.ietf.org/html/rfc2812#section-3.2.6>
@@ -260,6 +261,7 @@ class JoinTestCase(cases.BaseServerTestCase):
                 'or 323 (RPL_LISTEND), or but: {msg}')
 
     @cases.SpecificationSelector.requiredBySpecification('RFC1459', 'RFC2812')
+    @cases.OptionalityHelper.needsExclusiveServer
     def testListOne(self):
         """When a channel exists, LIST should get it in a reply.
         <https://tools.ietf.org/html/rfc1459#section-4.2.6>
@@ -308,11 +310,7 @@ class JoinTestCase(cases.BaseServerTestCase):
 
         # TODO: check foo is an operator
 
-        import time
-        time.sleep(0.1)
-        self.getMessages(1)
-        self.getMessages(2)
-        self.getMessages(3)
+        self.getMessagesAll([1, 2, 3])
         self.sendLine(1, 'KICK #chan bar :bye')
         try:
             m = self.getMessage(1)
@@ -8,6 +8,8 @@ from irctest.basecontrollers import NotImplementedByController
 class EchoMessageTestCase(cases.BaseServerTestCase):
     def _testEchoMessage(command, solo, server_time):
         @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+        @cases.OptionalityHelper.skipUnlessServerAdvertises('echo-message',
+                *(['server-time'] if server_time else []))
         def f(self):
             """<http://ircv3.net/specs/extensions/echo-message-3.2.html>
             """
@@ -26,6 +26,7 @@ class MetadataTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
         self.skipToWelcome(2)
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.1')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('extended-join')
     def testNotLoggedIn(self):
         self.connectClient('foo', capabilities=['extended-join'],
                 skip_if_cap_nak=True)
@@ -41,6 +42,7 @@ class MetadataTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.1')
     @cases.OptionalityHelper.skipUnlessHasMechanism('PLAIN')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('extended-join')
     def testNotLoggedIn(self):
         self.connectClient('foo', capabilities=['extended-join'],
                 skip_if_cap_nak=True)
@@ -7,17 +7,16 @@ from irctest.basecontrollers import NotImplementedByController
 
 class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledPrivmsgResponsesToMultipleClients(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
-        self.getMessages(1)
         self.connectClient('bar', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
-        self.getMessages(2)
         self.connectClient('carl', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
-        self.getMessages(3)
         self.connectClient('alice', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
-        self.getMessages(4)
+        self.getMessagesAll([1, 2, 3, 4])
 
         self.sendLine(1, '@draft/label=12345 PRIVMSG bar,carl,alice :hi')
+        self.syncAll([1, 2, 3, 4])
         m = self.getMessage(1)
         m2 = self.getMessage(2)
         m3 = self.getMessage(3)
@@ -34,6 +33,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertMessageEqual(m, command='BATCH', fail_msg='No BATCH echo received after sending one out')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledPrivmsgResponsesToClient(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -53,6 +53,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(m.tags['draft/label'], '12345', m, fail_msg="Echo'd PRIVMSG to a client did not contain the same label we sent it with(should be '12345'): {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledPrivmsgResponsesToChannel(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -80,6 +81,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(ms.tags['draft/label'], '12345', ms, fail_msg="Echo'd label doesn't match the label we sent (should be '12345'): {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledPrivmsgResponsesToSelf(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -98,6 +100,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(number_of_labels, 1, m1, fail_msg="When sending a PRIVMSG to self with echo-message, we only expect one message to contain the label. Instead, {} messages had the label".format(number_of_labels))
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledNoticeResponsesToClient(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -117,6 +120,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(m.tags['draft/label'], '12345', m, fail_msg="Echo'd NOTICE to a client did not contain the same label we sent it with(should be '12345'): {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledNoticeResponsesToChannel(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -144,6 +148,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(ms.tags['draft/label'], '12345', ms, fail_msg="Echo'd label doesn't match the label we sent (should be '12345'): {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response')
     def testLabeledNoticeResponsesToSelf(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -162,6 +167,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(number_of_labels, 1, m1, fail_msg="When sending a NOTICE to self with echo-message, we only expect one message to contain the label. Instead, {} messages had the label".format(number_of_labels))
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2')
     def testLabeledTagMsgResponsesToClient(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -189,6 +195,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(m2.tags['+draft/react'], 'l😃l', m, fail_msg="React tag wasn't the same on the source user's TAGMSG: {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2')
     def testLabeledTagMsgResponsesToChannel(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2'], skip_if_cap_nak=True)
         self.getMessages(1)
@@ -216,6 +223,7 @@ class LabeledResponsesTestCase(cases.BaseServerTestCase, cases.OptionalityHelper
         self.assertEqual(ms.tags['draft/label'], '12345', ms, fail_msg="Echo'd label doesn't match the label we sent (should be '12345'): {msg}")
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerAdvertises('batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2')
     def testLabeledTagMsgResponsesToSelf(self):
         self.connectClient('foo', capabilities=['batch', 'echo-message', 'draft/labeled-response', 'draft/message-tags-0.2'], skip_if_cap_nak=True)
         self.getMessages(1)
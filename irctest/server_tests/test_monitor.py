@@ -40,6 +40,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
                 extra_format=(nick,))
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitorOneDisconnected(self):
         """“If any of the targets being added are online, the server will
         generate RPL_MONONLINE numerics listing those targets that are
@@ -60,6 +61,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
         self.assertMonoffline(1, 'bar')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitorOneConnection(self):
         self.connectClient('foo')
         self.check_server_support()
@@ -69,6 +71,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
         self.assertMononline(1, 'bar')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitorOneConnected(self):
         """“If any of the targets being added are offline, the server will
         generate RPL_MONOFFLINE numerics listing those targets that are
@@ -88,6 +91,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
         self.assertMonoffline(1, 'bar')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitorOneConnection(self):
         self.connectClient('foo')
         self.check_server_support()
@@ -104,6 +108,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
         self.assertMononline(1, 'bar')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testMonitorConnectedAndDisconnected(self):
         """“If any of the targets being added are online, the server will
         generate RPL_MONONLINE numerics listing those targets that are
@@ -140,6 +145,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
                 '“MONITOR + bar,baz” and “baz” is disconnected: {msg}')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testUnmonitor(self):
         self.connectClient('foo')
         self.check_server_support()
@@ -160,6 +166,8 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
                 'nick: {got}')
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
+    @cases.OptionalityHelper.needsExclusiveServer
     def testMonitorForbidsMasks(self):
         """“The MONITOR implementation also enhances user privacy by
         disallowing subscription to hostmasks, allowing users to avoid
@@ -191,6 +199,7 @@ class EchoMessageTestCase(cases.BaseServerTestCase):
                     'was requested via hostmask connected: {}'.format(m))
 
     @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    @cases.OptionalityHelper.skipUnlessServerSupports('MONITOR')
     def testTwoMonitoringOneRemove(self):
         """Tests the following scenario:
         * foo MONITORs qux
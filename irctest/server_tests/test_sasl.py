@@ -4,6 +4,7 @@ from irctest import cases
 from irctest.irc_utils.message_parser import Message
 
 class RegistrationTestCase(cases.BaseServerTestCase):
+    @cases.OptionalityHelper.needsExclusiveServer
     def testRegistration(self):
         self.controller.registerUser(self, 'testuser', 'mypassword')
 
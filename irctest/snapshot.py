@@ -0,0 +1,78 @@
+"""Files created by one-time initialization steps of a software (eg. an
+empty database), so they are only created once for each build of it
+instead of before every test.
+
+Snapshots are stored in the cache directory, and files are hardlinked
+into the controller's directory; or, for files the software writes to,
+copied (as a reflink when the filesystem supports it)."""
+
+import os
+import fcntl
+import shutil
+import hashlib
+import tempfile
+
+from . import cache
+
+FICLONE = 0x40049409 # from linux/fs.h
+
+def _clone_file(source, destination):
+    with open(source, 'rb') as source_fd, \
+            open(destination, 'wb') as destination_fd:
+        try:
+            fcntl.ioctl(destination_fd.fileno(), FICLONE,
+                    source_fd.fileno())
+        except OSError: # Not supported by the OS or filesystem
+            shutil.copyfileobj(source_fd, destination_fd)
+
+def _link_file(source, destination):
+    try:
+        os.link(source, destination)
+    except OSError: # eg. on a different filesystem
+        shutil.copyfile(source, destination)
+
+def restore_snapshot(controller, name, build, directory,
+        mutable_files=()):
+    """Fills `directory` with the files `build(directory)` creates for the
+    software of the controller. `build` is only called the first time
+    for each build of the software (and version of its controller), and
+    its files are reused after that.
+
+    Files whose names are in `mutable_files` are copied, others are
+    hardlinked, so the software must not write to them.
+
+    `build` must raise an exception if it fails; nothing is saved then,
+    and it is called again next time."""
+    fingerprint = cache.controller_fingerprint(type(controller))
+    if fingerprint is None:
+        # Cannot tell which build of the software will run.
+        build(directory)
+        return
+    snapshot_directory = cache.cache_directory('snapshots', '{}-{}'.format(
+        name, hashlib.sha256(fingerprint.encode()).hexdigest()[0:16]))
+    files_directory = os.path.join(snapshot_directory, 'files')
+    with open(os.path.join(snapshot_directory, 'lock'), 'w') as lock:
+        # Other workers or runs may be building it at the same time.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not os.path.isdir(files_directory):
+            temp_directory = tempfile.mkdtemp(dir=snapshot_directory)
+            try:
+                build(temp_directory)
+                os.rename(temp_directory, files_directory)
+            except BaseException:
+                shutil.rmtree(temp_directory)
+                raise
+    for (dirpath, dirnames, filenames) in os.walk(files_directory):
+        relative_dirpath = os.path.relpath(dirpath, files_directory)
+        for dirname in dirnames:
+            os.makedirs(os.path.join(directory, relative_dirpath, dirname),
+                    exist_ok=True)
+        for filename in filenames:
+            relative_path = os.path.normpath(
+                    os.path.join(relative_dirpath, filename))
+            if relative_path in mutable_files:
+                copy = _clone_file
+            else:
+                copy = _link_file
+            copy(os.path.join(dirpath, filename),
+                    os.path.join(directory, relative_path))
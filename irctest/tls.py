@@ -1,4 +1,96 @@
+import os
+import time
+import fcntl
+import shutil
+import datetime
+import tempfile
+import contextlib
+import subprocess
 import collections
 
+from . import cache
+
 TlsConfig = collections.namedtuple('TlsConfig',
         'enable trusted_fingerprints')
+
+# Names of the files in the directory returned by material_directory()
+KEY_FILE = 'ssl.key'
+CERT_FILE = 'ssl.pem'
+DH_FILE = 'dh.pem'
+
+# Certificates are valid for 30 days, renew them long before.
+# DH parameters are 512 bits, the smallest size accepted by OpenSSL 3.
+MAX_AGE = 7*24*3600
+
+def _generate_with_openssl(directory, openssl_bin):
+    csr_path = os.path.join(directory, 'ssl.csr')
+    key_path = os.path.join(directory, KEY_FILE)
+    subprocess.check_output([openssl_bin, 'req', '-new', '-newkey', 'rsa',
+        '-nodes', '-out', csr_path, '-keyout', key_path,
+        '-batch'],
+        stderr=subprocess.DEVNULL)
+    subprocess.check_output([openssl_bin, 'x509', '-req',
+        '-in', csr_path, '-signkey', key_path,
+        '-out', os.path.join(directory, CERT_FILE)],
+        stderr=subprocess.DEVNULL)
+    subprocess.check_output([openssl_bin, 'dhparam',
+        '-out', os.path.join(directory, DH_FILE), '512'],
+        stderr=subprocess.DEVNULL)
+
+def _generate_in_process(directory):
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import dh, rsa
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'irctest')])
+    now = datetime.datetime.utcnow()
+    cert = x509.CertificateBuilder() \
+            .subject_name(name) \
+            .issuer_name(name) \
+            .public_key(key.public_key()) \
+            .serial_number(x509.random_serial_number()) \
+            .not_valid_before(now) \
+            .not_valid_after(now + datetime.timedelta(days=30)) \
+            .sign(key, hashes.SHA256())
+    parameters = dh.generate_parameters(generator=2, key_size=512)
+    with open(os.path.join(directory, KEY_FILE), 'wb') as fd:
+        fd.write(key.private_bytes(serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()))
+    with open(os.path.join(directory, CERT_FILE), 'wb') as fd:
+        fd.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(os.path.join(directory, DH_FILE), 'wb') as fd:
+        fd.write(parameters.parameter_bytes(serialization.Encoding.PEM,
+            serialization.ParameterFormat.PKCS3))
+
+@contextlib.contextmanager
+def material_directory(openssl_bin='openssl', in_process=False):
+    """Context manager giving the path to a directory in the cache with a
+    private key, a self-signed certificate, and DH parameters; generating
+    them with `openssl_bin` (or the cryptography module, if `in_process`
+    is True) if they do not exist or are old.
+
+    They are not renewed by other workers or runs until the context is
+    exited, so files taken from the directory meanwhile match."""
+    directory = cache.cache_directory('tls')
+    paths = [os.path.join(directory, name)
+            for name in (KEY_FILE, CERT_FILE, DH_FILE)]
+    with open(os.path.join(directory, 'lock'), 'w') as lock:
+        # Other workers or runs may be generating them at the same time.
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if not all(os.path.exists(path)
+                and time.time() - os.path.getmtime(path) < MAX_AGE
+                for path in paths):
+            temp_directory = tempfile.mkdtemp(dir=directory)
+            try:
+                if in_process:
+                    _generate_in_process(temp_directory)
+                else:
+                    _generate_with_openssl(temp_directory, openssl_bin)
+                for path in paths:
+                    os.replace(os.path.join(temp_directory,
+                        os.path.basename(path)), path)
+            finally:
+                shutil.rmtree(temp_directory)
+        yield directory
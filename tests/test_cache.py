@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from irctest import cache
+from irctest.basecontrollers import BaseServerController
+
+class FakeController(BaseServerController):
+    software_name = 'Fake'
+
+class CacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                {'IRCTEST_CACHE_DIR': self.cache_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testControllerWithoutExecutable(self):
+        self.assertIsNone(cache.controller_fingerprint(FakeController))
+        class Undeclared:
+            pass
+        self.assertIsNone(cache.controller_fingerprint(Undeclared))
+
+    def testControllerWithMissingExecutable(self):
+        class Missing(FakeController):
+            software_executable = 'irctest-no-such-executable'
+        self.assertIsNone(cache.controller_fingerprint(Missing))
+
+    def testControllerFingerprint(self):
+        class Python(FakeController):
+            software_executable = 'python3'
+        fingerprint = cache.controller_fingerprint(Python)
+        self.assertIn('Python', fingerprint)
+        self.assertEqual(fingerprint, cache.controller_fingerprint(Python))
+
+    def testJsonStoreMergesConcurrentSaves(self):
+        store1 = cache.JsonStore('foo.json')
+        store2 = cache.JsonStore('foo.json')
+        store1['a'] = 1
+        store1.save()
+        store2['b'] = 2
+        store2.save()
+        self.assertEqual(cache.JsonStore('foo.json').data, {'a': 1, 'b': 2})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import random
+import socket
+import unittest
+
+from irctest.exceptions import ConnectionClosed
+from irctest.irc_utils.framing import LineReader
+
+LINES = ['PING foo', '', ':bär!u@h PRIVMSG #c€ :héllo 🦆 wörld',
+        'x'*40, '🦆'*20, 'a\rb\nc']
+DATA = ''.join(line + '\r\n' for line in LINES).encode()
+
+class FakeSocket:
+    """Returns the given chunks of data from recv_into(), then EOF."""
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+    def recv_into(self, buffer):
+        if not self.chunks:
+            return 0
+        chunk = self.chunks.pop(0)
+        if len(chunk) > len(buffer):
+            self.chunks.insert(0, chunk[len(buffer):])
+            chunk = chunk[0:len(buffer)]
+        buffer[0:len(chunk)] = chunk
+        return len(chunk)
+
+def split(data, sizes):
+    chunks = []
+    for size in sizes:
+        (chunk, data) = (data[0:size], data[size:])
+        chunks.append(chunk)
+    return [chunk for chunk in chunks if chunk] + ([data] if data else [])
+
+def read_all(reader):
+    lines = []
+    try:
+        while True:
+            lines.append(reader.readline())
+    except ConnectionClosed:
+        return lines
+
+class LineReaderTestCase(unittest.TestCase):
+    def testSingleChunk(self):
+        reader = LineReader(FakeSocket([DATA]))
+        self.assertEqual(reader.receive(), len(LINES))
+        self.assertEqual(list(reader.lines), LINES)
+        self.assertFalse(reader.has_partial_line())
+
+    def testPartialLine(self):
+        reader = LineReader(FakeSocket([b'PING foo\r\nPING', b' bar\r',
+            b'\n']))
+        self.assertEqual(reader.receive(), 1)
+        self.assertTrue(reader.has_partial_line())
+        # CR received, but not LF
+        self.assertEqual(reader.receive(), 0)
+        self.assertTrue(reader.has_partial_line())
+        self.assertEqual(reader.receive(), 1)
+        self.assertFalse(reader.has_partial_line())
+        self.assertEqual(list(reader.lines), ['PING foo', 'PING bar'])
+        with self.assertRaises(ConnectionClosed):
+            reader.receive()
+
+    def testByteByByte(self):
+        reader = LineReader(FakeSocket(split(DATA, [1]*len(DATA))))
+        self.assertEqual(read_all(reader), LINES)
+
+    def testMultibyteCharacterSplit(self):
+        data = 'é€🦆\r\n'.encode()
+        for i in range(1, len(data)):
+            with self.subTest(i=i):
+                reader = LineReader(FakeSocket([data[0:i], data[i:]]))
+                self.assertEqual(read_all(reader), ['é€🦆'])
+
+    def testLinesLongerThanBuffer(self):
+        for buffer_size in range(2, 20):
+            with self.subTest(buffer_size=buffer_size):
+                reader = LineReader(FakeSocket([DATA]),
+                        buffer_size=buffer_size)
+                self.assertEqual(read_all(reader), LINES)
+                reader = LineReader(FakeSocket(split(DATA, [1]*len(DATA))),
+                        buffer_size=buffer_size)
+                self.assertEqual(read_all(reader), LINES)
+
+    def testRandomChunks(self):
+        rng = random.Random(42)
+        for _ in range(200):
+            sizes = [rng.randint(1, 30) for _ in range(len(DATA))]
+            buffer_size = rng.choice([2, 3, 5, 16, 64, 1024])
+            with self.subTest(sizes=sizes, buffer_size=buffer_size):
+                reader = LineReader(FakeSocket(split(DATA, sizes)),
+                        buffer_size=buffer_size)
+                self.assertEqual(read_all(reader), LINES)
+
+    def testSocket(self):
+        (sock1, sock2) = socket.socketpair()
+        self.addCleanup(sock1.close)
+        self.addCleanup(sock2.close)
+        reader = LineReader(sock2, buffer_size=16)
+        sock1.sendall(DATA)
+        sock1.close()
+        self.assertEqual(read_all(reader), LINES)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import time
+import types
+import socket
+import selectors
+import threading
+import unittest
+import functools
+
+from irctest import cases
+from irctest import client_mock
+from irctest.irc_utils import framing
+from irctest.exceptions import DeadlineExceeded
+from irctest.irc_utils.message_parser import Message
+
+def message(command, *params):
+    return Message(tags={}, prefix=None, command=command, params=list(params))
+
+class InboxTestCase(unittest.TestCase):
+    def testUnbounded(self):
+        inbox = client_mock.Inbox()
+        for i in range(1000):
+            inbox.append(message('PRIVMSG', '#chan', str(i)))
+        self.assertEqual(len(inbox), 1000)
+        self.assertEqual(inbox.nb_dropped, 0)
+        self.assertEqual(inbox.popleft().params, ['#chan', '0'])
+        self.assertEqual(len(inbox.drain()), 999)
+        self.assertEqual(len(inbox), 0)
+
+    def testBounded(self):
+        inbox = client_mock.Inbox(max_size=3)
+        for command in ['JOIN', 'PRIVMSG', 'PRIVMSG', 'NOTICE', 'PART']:
+            inbox.append(message(command))
+        self.assertEqual(len(inbox), 3)
+        self.assertEqual(inbox.nb_dropped, 2)
+        self.assertEqual(inbox.dropped_commands,
+                {'JOIN': 1, 'PRIVMSG': 1})
+        self.assertEqual([m.command for m in inbox.drain()],
+                ['PRIVMSG', 'NOTICE', 'PART'])
+        # Dropped messages are still counted after draining.
+        inbox.append(message('QUIT'))
+        self.assertEqual(inbox.nb_dropped, 2)
+        self.assertEqual([m.command for m in inbox.drain()], ['QUIT'])
+
+    def testBoundedPopleft(self):
+        inbox = client_mock.Inbox(max_size=2)
+        inbox.append(message('A'))
+        inbox.append(message('B'))
+        self.assertEqual(inbox.popleft().command, 'A')
+        inbox.append(message('C'))
+        self.assertEqual(inbox.nb_dropped, 0)
+        inbox.append(message('D'))
+        self.assertEqual(inbox.nb_dropped, 1)
+        self.assertEqual([m.command for m in inbox.drain()], ['C', 'D'])
+
+    def testEmpty(self):
+        inbox = client_mock.Inbox(max_size=0)
+        inbox.append(message('A'))
+        self.assertFalse(inbox)
+        self.assertEqual(inbox.nb_dropped, 1)
+        self.assertEqual(inbox.drain(), [])
+
+class ClientInboxTestCase(unittest.TestCase):
+    """Receives many messages with a bounded inbox, from a fake server
+    that replies to the synchronization PING after sending them."""
+    def setUp(self):
+        (self.server_sock, sock) = socket.socketpair()
+        self.addCleanup(self.server_sock.close)
+        self.client = client_mock.ClientMock('foo', show_io=False,
+                max_inbox_size=10)
+        # What ClientMock.connect() does, with a socket of the pair.
+        self.client.conn = sock
+        self.client.reader = framing.LineReader(sock)
+        self.client.selector = selectors.DefaultSelector()
+        self.client.selector.register(sock, selectors.EVENT_READ)
+        self.addCleanup(self.client.disconnect)
+
+    def serve(self, nb_messages):
+        reader = framing.LineReader(self.server_sock)
+        line = reader.readline()
+        (command, token) = line.split(' ', 1)
+        assert command == 'PING', line
+        self.server_sock.sendall(b''.join(
+            ':srv PRIVMSG foo :{}\r\n'.format(i).encode()
+            for i in range(nb_messages)))
+        self.server_sock.sendall('PONG srv {}\r\n'.format(token).encode())
+
+    def testGetMessages(self):
+        thread = threading.Thread(target=self.serve, args=(10000,))
+        thread.start()
+        messages = self.client.getMessages()
+        thread.join()
+        self.assertEqual([m.params[1] for m in messages],
+                [str(i) for i in range(9990, 10000)])
+        self.assertEqual(self.client.inbox.nb_dropped, 9990)
+        self.assertEqual(self.client.inbox.dropped_commands,
+                {'PRIVMSG': 9990})
+
+    def testSynchronizeAll(self):
+        thread = threading.Thread(target=self.serve, args=(3,))
+        thread.start()
+        client_mock.synchronize_all([self.client])
+        thread.join()
+        self.assertEqual([m.params[1] for m in self.client.inbox.drain()],
+                ['0', '1', '2'])
+
+    def testSynchronizeAllTimeout(self):
+        # The server never replies to the PING
+        with self.assertRaises(DeadlineExceeded):
+            client_mock.synchronize_all([self.client], timeout=0.1)
+
+    def sendLines(self, *lines):
+        self.server_sock.sendall(b''.join(
+            line.encode() + b'\r\n' for line in lines))
+
+    def assertNothingSent(self):
+        self.server_sock.setblocking(False)
+        with self.assertRaises(BlockingIOError):
+            self.server_sock.recv(1024)
+
+    def testWaitFor(self):
+        self.sendLines(':srv NOTICE * :hello', ':srv PRIVMSG foo :hi',
+                ':srv 001 foo :Welcome', ':srv 002 foo :Your host')
+        start = time.monotonic()
+        m = self.client.waitFor(lambda m: m.command == '001', timeout=10)
+        # Returned as soon as it arrived, without synchronizing
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(m.params, ['foo', 'Welcome'])
+        self.assertNothingSent()
+        # Messages before it are discarded, the others are kept
+        self.assertEqual([m.command for m in self.client.inbox.drain()],
+                ['002'])
+
+    def testWaitForArrivingLater(self):
+        timer = threading.Timer(0.1, self.sendLines, [':srv 001 foo :Hi'])
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertEqual(self.client.waitFor(timeout=10).command, '001')
+
+    def testWaitForDeadline(self):
+        self.sendLines(':srv NOTICE * :hello', ':srv PRIVMSG foo :hi')
+        with self.assertRaisesRegex(DeadlineExceeded,
+                'Client foo: .* within 0.2s; received: NOTICE PRIVMSG'):
+            self.client.waitFor(lambda m: m.command == '001', timeout=0.2)
+        self.assertNothingSent()
+
+    def testServerTestCaseWaitFor(self):
+        case = types.SimpleNamespace(clients={1: self.client})
+        case.waitFor = functools.partial(cases.BaseServerTestCase.waitFor,
+                case)
+        self.sendLines(':srv NOTICE * :hello', ':srv 001 foo :Welcome')
+        m = cases.BaseServerTestCase.getRegistrationMessage(case, 1)
+        self.assertEqual(m.command, '001')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import types
+import tempfile
+import unittest
+from unittest import mock
+
+from irctest import runner
+from irctest import incremental
+from irctest.parallel import RecordedTest
+from irctest.basecontrollers import BaseServerController
+
+class FakeController(BaseServerController):
+    software_name = 'Fake'
+    software_executable = 'python3'
+
+class FakeTestCase(unittest.TestCase):
+    def testFoo(self):
+        pass
+    def testBar(self):
+        pass
+
+def make_result(outcomes):
+    return types.SimpleNamespace(
+            test_outcomes={test_id: [(outcome, None)]
+                for (test_id, outcome) in outcomes.items()},
+            test_durations={test_id: 1.0 for test_id in outcomes})
+
+def reused_ids(suite):
+    return [test.id() for test in suite if isinstance(test, RecordedTest)]
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                {'IRCTEST_CACHE_DIR': self.cache_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tests = [FakeTestCase('testFoo'), FakeTestCase('testBar')]
+        (self.foo_id, self.bar_id) = [test.id() for test in self.tests]
+
+    def run_and_replay(self, outcomes, flags=('a',), new_flags=('a',)):
+        """Stores outcomes of a run, and returns the ids of the tests
+        whose outcomes are reused in the next one."""
+        results = incremental.ResultCache(FakeController, flags)
+        results.update(self.tests, make_result(outcomes))
+        results = incremental.ResultCache(FakeController, new_flags)
+        return reused_ids(results.replay_unchanged(
+            unittest.TestSuite(self.tests)))
+
+    def testReuse(self):
+        self.assertEqual(self.run_and_replay(
+            {self.foo_id: 'success', self.bar_id: 'skip'}),
+            [self.foo_id, self.bar_id])
+
+    def testFailuresRunAgain(self):
+        self.assertEqual(self.run_and_replay(
+            {self.foo_id: 'success', self.bar_id: 'failure'}),
+            [self.foo_id])
+
+    def testSkippedBeforeSetupNotStored(self):
+        # eg. because of the probe, which the next run may disable
+        runner.skip_before_setup(self.tests[1], 'Not supported')
+        results = incremental.ResultCache(FakeController, ())
+        results.update(self.tests, make_result(
+            {self.foo_id: 'success', self.bar_id: 'skip'}))
+        self.tests[1] = FakeTestCase('testBar')
+        results = incremental.ResultCache(FakeController, ())
+        self.assertEqual(reused_ids(results.replay_unchanged(
+            unittest.TestSuite(self.tests))), [self.foo_id])
+
+    def testFlagsChanged(self):
+        self.assertEqual(self.run_and_replay(
+            {self.foo_id: 'success'}, new_flags=('b',)), [])
+
+    def testHarnessChanged(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py') as fd:
+            with mock.patch('irctest.incremental._harness_files',
+                    lambda: [fd.name]):
+                results = incremental.ResultCache(FakeController, ())
+                results.update(self.tests,
+                        make_result({self.foo_id: 'success'}))
+                fd.write('# changed\n')
+                fd.flush()
+                results = incremental.ResultCache(FakeController, ())
+                self.assertEqual(reused_ids(results.replay_unchanged(
+                    unittest.TestSuite(self.tests))), [])
+
+    def testHarnessFiles(self):
+        names = [os.path.relpath(path, os.path.dirname(incremental.__file__))
+                for path in incremental._harness_files()]
+        self.assertIn('runner.py', names)
+        self.assertIn(os.path.join('irc_utils', 'framing.py'), names)
+        self.assertIn(os.path.join('controllers', 'charybdis.py'), names)
+        self.assertNotIn(os.path.join('server_tests', 'test_cap.py'), names)
+
+    def testSoftwareNotInstalled(self):
+        class Missing(FakeController):
+            software_executable = 'irctest-no-such-executable'
+        results = incremental.ResultCache(Missing, ())
+        results.update(self.tests, make_result({self.foo_id: 'success'}))
+        self.assertEqual(reused_ids(results.replay_unchanged(
+            unittest.TestSuite(self.tests))), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from irctest.exceptions import NickTooLong
+from irctest.irc_utils import message_parser
+from irctest.irc_utils.namespacing import Namespace
+
+class NamespaceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.ns = Namespace()
+        self.s = self.ns.suffix
+
+    def testSuffixesAreUnique(self):
+        self.assertNotEqual(self.s, Namespace().suffix)
+
+    def testMangle(self):
+        self.assertEqual(self.ns.mangle('#chan'), '#chan' + self.s)
+        self.assertEqual(self.ns.mangle('&chan'), '&chan' + self.s)
+        self.assertEqual(self.ns.mangle('foo', nick=True), 'foo' + self.s)
+        self.assertEqual(self.ns.mangle('foo'), 'foo')
+        for name in ('', '*', 'foo*', 'foo!*@*', 'f?o'):
+            self.assertEqual(self.ns.mangle(name, nick=True), name)
+
+    def testMangleLine(self):
+        self.assertEqual(self.ns.mangle_line('NICK foo'), 'NICK foo' + self.s)
+        self.assertEqual(self.ns.mangle_line('JOIN #a,#b\r\n'),
+                'JOIN #a{s},#b{s}\r\n'.format(s=self.s))
+        self.assertEqual(self.ns.mangle_line('PRIVMSG bar :hi foo'),
+                'PRIVMSG bar{} :hi foo'.format(self.s))
+        self.assertEqual(self.ns.mangle_line('@label=1 PRIVMSG #c :x y'),
+                '@label=1 PRIVMSG #c{} :x y'.format(self.s))
+        self.assertEqual(self.ns.mangle_line('KICK #c foo :bye'),
+                'KICK #c{s} foo{s} :bye'.format(s=self.s))
+        self.assertEqual(self.ns.mangle_line('USER u * * :Real Name'),
+                'USER u * * :Real Name')
+        self.assertEqual(self.ns.mangle_line('PING foo'), 'PING foo')
+
+    def testMangleModeParameter(self):
+        self.ns.mangle('foo', nick=True)
+        self.assertEqual(self.ns.mangle_line('MODE #c +o foo'),
+                'MODE #c{s} +o foo{s}'.format(s=self.s))
+        self.assertEqual(self.ns.mangle_line('MODE #c +b bar'),
+                'MODE #c{} +b bar'.format(self.s))
+
+    def testUnmangle(self):
+        self.assertEqual(self.ns.unmangle(
+            'foo{s}!~u@host #a{s},#b{s} :x{s}'.format(s=self.s)),
+            'foo!~u@host #a,#b :x')
+        # Not followed by the end of a name
+        self.assertEqual(self.ns.unmangle('foo{}x'.format(self.s)),
+                'foo{}x'.format(self.s))
+        # Other namespaces are left alone
+        other = Namespace()
+        self.assertEqual(self.ns.unmangle('foo' + other.suffix),
+                'foo' + other.suffix)
+
+    def testUnmangleMessage(self):
+        msg = message_parser.parse_message(
+                ':foo{s}!u@h PRIVMSG #c{s} :hi bar{s}\r\n'.format(s=self.s))
+        msg = self.ns.unmangle_message(msg)
+        self.assertEqual(msg.prefix, 'foo!u@h')
+        self.assertEqual(msg.command, 'PRIVMSG')
+        self.assertEqual(msg.params, ['#c', 'hi bar'])
+
+    def testRoundTrip(self):
+        line = 'PRIVMSG foo,#chan :hello'
+        msg = message_parser.parse_message(self.ns.mangle_line(line) + '\r\n')
+        self.assertEqual(self.ns.unmangle_message(msg).params,
+                ['foo,#chan', 'hello'])
+
+    def testNickTooLong(self):
+        ns = Namespace()
+        ns.nicklen = len('foo' + ns.suffix) + 1
+        self.assertEqual(ns.mangle('foo', nick=True), 'foo' + ns.suffix)
+        self.assertFalse(ns.nick_too_long)
+        with self.assertRaises(NickTooLong):
+            ns.mangle('foobarbaz', nick=True)
+        self.assertTrue(ns.nick_too_long)
+        # Channel names are not limited by NICKLEN
+        self.assertEqual(ns.mangle('#foobarbaz'), '#foobarbaz' + ns.suffix)
+
+if __name__ == '__main__':
+    unittest.main()
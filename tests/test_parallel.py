@@ -0,0 +1,82 @@
+import io
+import unittest
+import contextlib
+
+from irctest import runner
+from irctest.parallel import ParallelTestSuite
+
+def dummy_test_case():
+    """Returns a test case class with tests of each outcome. It is not
+    defined at the module level, as some of its tests fail."""
+    class DummyTestCase(unittest.TestCase):
+        def testSuccess(self):
+            pass
+        def testFailure(self):
+            self.fail('oops')
+        def testError(self):
+            raise ValueError('oops')
+        def testSkip(self):
+            self.skipTest('not supported')
+        @unittest.expectedFailure
+        def testExpectedFailure(self):
+            self.fail('expected')
+        def testSubTests(self):
+            for i in range(3):
+                with self.subTest(i=i):
+                    self.assertNotEqual(i, 1)
+    return DummyTestCase
+
+def make_suite():
+    loader = unittest.defaultTestLoader
+    return loader.loadTestsFromTestCase(dummy_test_case())
+
+def run_tests(suite, failfast=False):
+    """Runs tests (quietly), and returns the result."""
+    testRunner = runner.TextTestRunner(stream=io.StringIO(),
+            failfast=failfast)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return testRunner.run(suite)
+
+def base_id(test):
+    # Failures of subtests that ran in workers are reported as failures
+    # of their test.
+    return test.id().split(' ')[0]
+
+def totals(result):
+    return {
+            'run': result.testsRun,
+            'failures': sorted(base_id(test) for (test, detail)
+                in result.failures),
+            'errors': sorted(base_id(test) for (test, detail)
+                in result.errors),
+            'skipped': sorted((test.id(), reason) for (test, reason)
+                in result.skipped),
+            'expectedFailures': sorted(test.id() for (test, detail)
+                in result.expectedFailures),
+            'unexpectedSuccesses': len(result.unexpectedSuccesses),
+            'shouldStop': result.shouldStop,
+            }
+
+class ParallelTestSuiteTestCase(unittest.TestCase):
+    def testSameAsSequential(self):
+        sequential = run_tests(make_suite())
+        parallel = run_tests(ParallelTestSuite(make_suite(), jobs=2))
+        self.assertEqual(totals(parallel), totals(sequential))
+        self.assertEqual(sorted(parallel.test_outcomes),
+                sorted(sequential.test_outcomes))
+        self.assertEqual(set(parallel.test_durations),
+                set(sequential.test_durations))
+        # Details are formatted in workers
+        (test, detail) = parallel.errors[0]
+        self.assertIn('ValueError: oops', detail)
+
+    def testFailfast(self):
+        sequential = run_tests(make_suite(), failfast=True)
+        parallel = run_tests(ParallelTestSuite(make_suite(), jobs=2),
+                failfast=True)
+        self.assertTrue(sequential.shouldStop)
+        self.assertTrue(parallel.shouldStop)
+        self.assertLess(parallel.testsRun, len(list(make_suite())))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import time
+import unittest
+import threading
+from unittest import mock
+
+from irctest import phases
+
+class Clock:
+    """Replaces time.monotonic(), and only moves when told to."""
+    def __init__(self):
+        self.now = 0
+    def __call__(self):
+        return self.now
+    def advance(self, seconds):
+        self.now += seconds
+
+class PhasesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        patcher = mock.patch('time.monotonic', self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def testNotMeasuring(self):
+        with phases.phase('receive'):
+            pass
+        phases.switch('test')
+        self.assertEqual(phases.stop_test(), {})
+
+    def testNested(self):
+        phases.start_test()
+        self.clock.advance(1)
+        with phases.phase('server start'):
+            self.clock.advance(2)
+        phases.switch('test')
+        self.clock.advance(3)
+        with phases.phase('registration'):
+            self.clock.advance(4)
+            with phases.phase('receive'):
+                self.clock.advance(5)
+            self.clock.advance(6)
+        self.clock.advance(7)
+        phases.switch('tearDown')
+        self.clock.advance(8)
+        self.assertEqual(phases.stop_test(), {'setUp': 1,
+            'server start': 2, 'test': 10, 'registration': 10,
+            'receive': 5, 'tearDown': 8})
+        # Stopped
+        self.assertEqual(phases.stop_test(), {})
+
+    def testThreads(self):
+        phases.start_test()
+        self.clock.advance(1)
+        thread = threading.Thread(target=phases.start_test)
+        thread.start()
+        thread.join()
+        self.assertEqual(phases.stop_test(), {'setUp': 1})
+
+    def testPrint(self):
+        test_phases = {'a': {'setUp': 1, 'test': 3, 'custom': 4},
+                'b': {'setUp': 1, 'test': 1}}
+        out = io.StringIO()
+        phases.print_test_phases(test_phases, file=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'Test   setUp    test  custom',
+            'a      1.000   3.000   4.000',
+            'b      1.000   1.000   0.000'])
+        out = io.StringIO()
+        phases.print_aggregate('Foo', test_phases, file=out)
+        self.assertEqual(out.getvalue().splitlines(), [
+            'Time spent in each phase of 2 test(s) with Foo:',
+            '\tsetUp                2.000s  20.0%    1.000s/test',
+            '\ttest                 4.000s  40.0%    2.000s/test',
+            '\tcustom               4.000s  40.0%    2.000s/test'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import socket
+import unittest
+import contextlib
+import multiprocessing
+from unittest import mock
+
+from irctest import ports
+
+def reserve_in_child(broker, queue):
+    queue.put(broker.reserve('127.0.0.1'))
+
+class PortBrokerTestCase(unittest.TestCase):
+    def testReservedPortCanBeBound(self):
+        (hostname, port) = ports.reserve_port('127.0.0.1')
+        with contextlib.closing(socket.socket()) as s:
+            # As servers do
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            s.bind((hostname, port))
+            s.listen(1)
+
+    def testNoDuplicates(self):
+        broker = ports.PortBroker()
+        reserved = [broker.reserve('127.0.0.1') for i in range(50)]
+        self.assertEqual(len(set(reserved)), 50)
+
+    def testSharedWithForkedProcesses(self):
+        context = multiprocessing.get_context('fork')
+        broker = ports.PortBroker()
+        queue = context.Queue()
+        processes = [context.Process(target=reserve_in_child,
+            args=(broker, queue)) for i in range(4)]
+        for process in processes:
+            process.start()
+        reserved = [queue.get(timeout=10) for process in processes]
+        reserved.append(broker.reserve('127.0.0.1'))
+        for process in processes:
+            process.join()
+        self.assertEqual(len(set(reserved)), 5)
+
+    def testGivenPortsAreNotReused(self):
+        broker = ports.PortBroker()
+        # The kernel keeps giving the same port
+        with mock.patch('irctest.ports.reserve_port',
+                return_value=('127.0.0.1', 12345)):
+            self.assertEqual(broker.reserve(), ('127.0.0.1', 12345))
+            with self.assertRaises(OSError):
+                broker.reserve()
+
+if __name__ == '__main__':
+    unittest.main()
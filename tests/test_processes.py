@@ -0,0 +1,111 @@
+import os
+import sys
+import unittest
+import subprocess
+
+import psutil
+
+from irctest import processes
+
+# Starts a child, prints its pid, and waits. Ignores SIGTERM if
+# 'stubborn' is given.
+PARENT = '''
+import sys, time, signal, subprocess
+if 'stubborn' in sys.argv:
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])
+print(child.pid, flush=True)
+time.sleep(60)
+'''
+
+def make_buffer(chunks, size):
+    """Returns an OutputBuffer of the given size, after the chunks were
+    written to its pipe."""
+    (read_fd, write_fd) = os.pipe()
+    output = processes.OutputBuffer(open(read_fd, 'rb'), size=size)
+    for chunk in chunks:
+        os.write(write_fd, chunk)
+    os.close(write_fd)
+    output.thread.join(timeout=5)
+    return output
+
+class OutputBufferTestCase(unittest.TestCase):
+    def testSmallOutput(self):
+        output = make_buffer([b'foo\n', b'bar\n'], 16)
+        self.assertEqual(output.position(), 8)
+        self.assertEqual(output.getvalue(), 'foo\nbar\n')
+        self.assertEqual(output.getvalue(4), 'bar\n')
+        self.assertEqual(output.getvalue(8), '')
+
+    def testTruncation(self):
+        output = make_buffer([b'line1\n', b'line2\n', b'line3\n'], 10)
+        self.assertEqual(output.position(), 18)
+        # 'line1\nli' was overwritten, the rest of its line is not shown
+        self.assertEqual(output.getvalue(), '[8 bytes dropped]\nline3\n')
+        self.assertEqual(output.getvalue(6), '[2 bytes dropped]\nline3\n')
+        self.assertEqual(output.getvalue(8), 'ne2\nline3\n')
+        self.assertEqual(output.getvalue(12), 'line3\n')
+
+    def testWrapAround(self):
+        output = make_buffer([b'abcdef', b'ghij', b'klmn'], 8)
+        self.assertEqual(output.getvalue(6), 'ghijklmn')
+
+    def testChunkLargerThanBuffer(self):
+        output = make_buffer([b'ab', b'cdefghijklmn\nop'], 8)
+        self.assertEqual(output.position(), 17)
+        self.assertEqual(output.getvalue(9), 'jklmn\nop')
+        self.assertEqual(output.getvalue(), '[9 bytes dropped]\nop')
+
+class KillTreeTestCase(unittest.TestCase):
+    def spawn(self, *args):
+        (read_fd, write_fd) = os.pipe()
+        proc = processes.spawn([sys.executable, '-c', PARENT] + list(args),
+                stdout=write_fd)
+        os.close(write_fd)
+        self.addCleanup(processes.kill_tree, proc, timeout=0)
+        with open(read_fd) as fd:
+            child_pid = int(fd.readline())
+        return (proc, psutil.Process(child_pid))
+
+    def assertStopped(self, proc, child):
+        self.assertIsNotNone(proc.returncode)
+        self.assertFalse(child.is_running()
+                and child.status() != psutil.STATUS_ZOMBIE)
+        self.assertNotIn(proc.pid, processes._running)
+
+    def testKillTree(self):
+        (proc, child) = self.spawn()
+        self.assertIn(proc.pid, processes._running)
+        processes.kill_tree(proc)
+        self.assertStopped(proc, child)
+
+    def testKillsStubbornProcesses(self):
+        (proc, child) = self.spawn('stubborn')
+        processes.kill_tree(proc, timeout=0.5)
+        self.assertStopped(proc, child)
+
+    def testKillsReparentedChildren(self):
+        (proc, child) = self.spawn()
+        proc.kill()
+        proc.wait()
+        # The child is not a descendant anymore, but still in the session,
+        # which is signaled without waiting for the processes in it.
+        processes.kill_tree(proc)
+        psutil.wait_procs([child], timeout=5)
+        self.assertStopped(proc, child)
+
+    def testReapedProcess(self):
+        proc = processes.spawn([sys.executable, '-c', ''])
+        proc.wait()
+        # Its pid is now used by another process
+        victim = subprocess.Popen([sys.executable, '-c',
+            'import time; time.sleep(60)'])
+        self.addCleanup(victim.wait)
+        self.addCleanup(victim.kill)
+        self.addCleanup(processes._running.pop, proc.pid, None)
+        proc.pid = victim.pid
+        processes.kill_tree(proc)
+        self.assertIsNone(victim.poll())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import sys
+import socket
+import tempfile
+import unittest
+import contextlib
+import subprocess
+
+from irctest import ports
+from irctest import readiness
+from irctest.exceptions import ServerNotReady
+
+# Listens on the port given as argument after writing a pidfile, if a path
+# is given.
+SERVER = '''
+import os, sys, time, socket
+s = socket.socket()
+s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+s.bind(('127.0.0.1', int(sys.argv[1])))
+if len(sys.argv) > 2:
+    with open(sys.argv[2], 'w') as fd:
+        fd.write(str(os.getpid()))
+time.sleep(0.2)
+s.listen(1)
+time.sleep(60)
+'''
+
+class FakeController:
+    software_name = 'Fake'
+    def __init__(self, args):
+        self.directory = tempfile.mkdtemp()
+        (hostname, self.port) = ports.reserve_port('127.0.0.1')
+        self.proc = subprocess.Popen([sys.executable, '-c', SERVER,
+            str(self.port)] + [os.path.join(self.directory, arg)
+                for arg in args])
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.wait()
+        for name in os.listdir(self.directory):
+            os.unlink(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+class ReadinessTestCase(unittest.TestCase):
+    def start(self, *args):
+        controller = FakeController(args)
+        self.addCleanup(controller.kill)
+        return controller
+
+    def assertListening(self, controller):
+        with contextlib.closing(socket.create_connection(
+                ('127.0.0.1', controller.port), timeout=1)):
+            pass
+
+    def testConnectProbe(self):
+        controller = self.start()
+        readiness.ConnectProbe().wait(controller, '127.0.0.1')
+        self.assertListening(controller)
+
+    def testListenWatch(self):
+        controller = self.start()
+        strategy = readiness.ListenWatch()
+        self.assertFalse(strategy.is_ready(controller, '127.0.0.1'))
+        strategy.wait(controller, '127.0.0.1')
+        self.assertListening(controller)
+
+    def testPidfileWatch(self):
+        controller = self.start('server.pid')
+        readiness.PidfileWatch('server.pid').wait(controller, '127.0.0.1')
+        self.assertTrue(os.path.exists(
+            os.path.join(controller.directory, 'server.pid')))
+        self.assertListening(controller)
+
+    def testExited(self):
+        controller = self.start()
+        controller.proc.kill()
+        for strategy in (readiness.ConnectProbe(), readiness.ListenWatch(),
+                readiness.PidfileWatch('server.pid')):
+            with self.subTest(strategy=strategy):
+                with self.assertRaisesRegex(ServerNotReady, 'exited'):
+                    strategy.wait(controller, '127.0.0.1')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+
+from irctest import report
+from irctest import runner
+from irctest.parallel import RecordedTest
+
+FAILURE = 'Traceback (most recent call last):\nAssertionError: oops\n'
+
+def run_tests(tests):
+    """Runs tests (quietly), and returns the result."""
+    testRunner = runner.TextTestRunner(stream=io.StringIO())
+    with contextlib.redirect_stdout(io.StringIO()):
+        return testRunner.run(unittest.TestSuite(tests))
+
+class ReportTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def writeShard(self, name, tests):
+        path = self.path(name)
+        report.write_results(path, 'Foo', tests, run_tests(tests))
+        return path
+
+    def merge(self, paths):
+        """Runs the merge command, and returns its exit code and output."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), \
+                contextlib.redirect_stderr(output):
+            with self.assertRaises(SystemExit) as cm:
+                report.merge(paths)
+        return (cm.exception.code, output.getvalue())
+
+    def testRoundTrip(self):
+        tests = [
+                RecordedTest('a.A.testOk', 'testOk (a.A)', 'Doc.',
+                    [('success', None)], 1.5),
+                RecordedTest('a.A.testSkip', 'testSkip (a.A)', None,
+                    [('skip', 'Not supported')], 0),
+                RecordedTest('a.A.testFail', 'testFail (a.A)', None,
+                    [('failure', FAILURE)], 2),
+                ]
+        (software_name, read_tests) = report.read_results(
+                self.writeShard('results.json', tests))
+        self.assertEqual(software_name, 'Foo')
+        self.assertEqual(
+                [(t.id(), str(t), t.description(), t.outcomes, t.duration)
+                    for t in read_tests],
+                [('a.A.testOk', 'testOk (a.A)', 'Doc.',
+                    [('success', None)], 1.5),
+                 ('a.A.testSkip', 'testSkip (a.A)', None,
+                    [('skip', 'Not supported')], 0),
+                 ('a.A.testFail', 'testFail (a.A)', None,
+                    [('failure', FAILURE)], 2)])
+
+    def testNotRunTestsAreNotWritten(self):
+        tests = [RecordedTest('a.A.test{}'.format(i), 'test', None,
+            [('success', None)], 0) for i in range(2)]
+        path = self.path('results.json')
+        report.write_results(path, 'Foo', tests, run_tests(tests[0:1]))
+        self.assertEqual([test.id() for test in report.read_results(path)[1]],
+                ['a.A.test0'])
+
+    def testMergeSuccesses(self):
+        paths = [
+                self.writeShard('1.json', [RecordedTest('a.A.test1', 'test1',
+                    None, [('success', None)], 0)]),
+                self.writeShard('2.json', [RecordedTest('a.A.test2', 'test2',
+                    None, [('skip', 'Not supported')], 0)]),
+                ]
+        (code, output) = self.merge(paths)
+        self.assertEqual(code, 0, output)
+        self.assertIn('Merging results of Foo on 2 test(s).', output)
+        self.assertIn('Ran 2 tests', output)
+        self.assertIn('OK (skipped=1)', output)
+
+    def testMergeFailures(self):
+        paths = [
+                self.writeShard('1.json', [RecordedTest('a.A.test1', 'test1',
+                    None, [('success', None)], 0)]),
+                self.writeShard('2.json', [RecordedTest('a.A.test2', 'test2',
+                    None, [('failure', FAILURE)], 0)]),
+                ]
+        (code, output) = self.merge(paths)
+        self.assertEqual(code, 1, output)
+        self.assertIn('FAILED (failures=1)', output)
+        self.assertIn('AssertionError: oops', output)
+
+    def testMergeDuplicates(self):
+        test = RecordedTest('a.A.test1', 'test1', None, [('success', None)],
+                0)
+        paths = [self.writeShard('1.json', [test]),
+                self.writeShard('2.json', [test])]
+        (code, output) = self.merge(paths)
+        self.assertEqual(code, 0, output)
+        self.assertIn('a.A.test1 is in several result files.', output)
+        self.assertIn('Ran 1 test', output)
+
+if __name__ == '__main__':
+    unittest.main()
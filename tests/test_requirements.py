@@ -0,0 +1,187 @@
+import io
+import unittest
+import contextlib
+
+from irctest import cases
+from irctest import runner
+from irctest.specifications import Specifications
+from irctest.controllers.charybdis import CharybdisController
+
+class FakeController:
+    software_name = 'Fake'
+
+class FakeTestCase(cases.BaseClientTestCase):
+    controllerClass = FakeController
+    testedSpecifications = frozenset([Specifications.RFC1459])
+    strictTests = False
+    setups = []
+
+    def setUp(self):
+        self.setups.append(self.id())
+
+    def tearDown(self):
+        pass
+
+    @cases.SpecificationSelector.requiredBySpecification('RFC1459')
+    def testRequired(self):
+        """Runs."""
+        self.assertTrue(self.setups)
+
+    @cases.SpecificationSelector.requiredBySpecification('IRCv3.2')
+    def testNotRequired(self):
+        pass
+
+    @cases.SpecificationSelector.requiredBySpecification('RFC1459',
+            strict=True)
+    def testStrict(self):
+        pass
+
+    def testUndecorated(self):
+        pass
+
+def run_tests(suite):
+    """Runs tests (quietly), and returns the result."""
+    testRunner = runner.TextTestRunner(stream=io.StringIO())
+    with contextlib.redirect_stdout(io.StringIO()):
+        return testRunner.run(suite)
+
+def make_suite(*names):
+    return unittest.TestSuite(FakeTestCase(name) for name in names)
+
+class SkipBeforeSetupTestCase(unittest.TestCase):
+    def setUp(self):
+        FakeTestCase.setups = []
+
+    def skipReasons(self, result):
+        return {test.id().split('.')[-1]: reason
+                for (test, reason) in result.skipped}
+
+    def testSameReasonsAsWithoutPreSkip(self):
+        names = ['testRequired', 'testNotRequired', 'testStrict',
+                'testUndecorated']
+        expected = run_tests(make_suite(*names))
+        suite = make_suite(*names)
+        runner.skip_unmet_requirements(suite)
+        FakeTestCase.setups = []
+        result = run_tests(suite)
+        self.assertEqual(self.skipReasons(result), {
+            'testNotRequired': str(runner.NotRequiredBySpecifications()),
+            'testStrict': str(runner.SkipStrictTest())})
+        self.assertEqual(self.skipReasons(result),
+                self.skipReasons(expected))
+        self.assertEqual(result.testsRun, 4)
+        self.assertTrue(result.wasSuccessful())
+
+    def testSetUpNotCalled(self):
+        suite = make_suite('testNotRequired', 'testStrict')
+        runner.skip_unmet_requirements(suite)
+        self.assertTrue(all(map(runner.is_skipped_before_setup, suite)))
+        run_tests(suite)
+        self.assertEqual(FakeTestCase.setups, [])
+
+    def testRequiredTestsRun(self):
+        suite = make_suite('testRequired', 'testUndecorated')
+        runner.skip_unmet_requirements(suite)
+        self.assertFalse(any(map(runner.is_skipped_before_setup, suite)))
+        result = run_tests(suite)
+        self.assertEqual(len(FakeTestCase.setups), 2)
+        self.assertEqual(result.skipped, [])
+        # Timed by the wrapper from _IrcTestCase.__init__
+        test_id = FakeTestCase('testRequired').id()
+        self.assertIn('test', result.test_phases[test_id])
+
+    def testWrappersCompose(self):
+        test = FakeTestCase('testStrict')
+        method = getattr(test, 'testStrict')
+        # Metadata copied by functools.wraps through both wrappers
+        self.assertEqual(method.__name__, 'testStrict')
+        self.assertEqual(method.required_specifications,
+                frozenset([Specifications.RFC1459]))
+        self.assertTrue(method.strict_test)
+        self.assertEqual(FakeTestCase('testRequired').shortDescription(),
+                'Runs.')
+        runner.skip_before_setup(test, 'Some reason')
+        self.assertEqual(getattr(test, 'testStrict').__name__, 'testStrict')
+
+    def testStrictTestsEnabled(self):
+        class StrictTestCase(FakeTestCase):
+            strictTests = True
+        suite = unittest.TestSuite([StrictTestCase('testStrict')])
+        runner.skip_unmet_requirements(suite)
+        self.assertFalse(any(map(runner.is_skipped_before_setup, suite)))
+
+class SopelLikeController:
+    """Declares SASL mechanisms, but not capabilities."""
+    software_name = 'SopelLike'
+    supported_sasl_mechanisms = {'PLAIN'}
+
+def sasl_test_case(controller_class):
+    """Returns a test case class for the controller, with tests requiring
+    SASL or capabilities. It is not defined at the module level, as its
+    tests must not run on their own."""
+    class SaslTestCase(cases.BaseServerTestCase, cases.OptionalityHelper):
+        controllerClass = controller_class
+        testedSpecifications = frozenset(Specifications)
+        strictTests = True
+
+        def setUp(self):
+            raise AssertionError('setUp called')
+
+        @cases.OptionalityHelper.skipUnlessHasMechanism('PLAIN')
+        def testPlain(self):
+            pass
+
+        @cases.OptionalityHelper.skipUnlessHasSasl
+        def testSasl(self):
+            pass
+
+        @cases.OptionalityHelper.skipUnlessSupportsCapability('sasl')
+        def testCapability(self):
+            pass
+    return SaslTestCase
+
+class ControllerRequirementsTestCase(unittest.TestCase):
+    def skipReasons(self, test_case_class, names):
+        suite = unittest.TestSuite(test_case_class(name) for name in names)
+        runner.skip_unmet_requirements(suite)
+        return {test._testMethodName: getattr(test,
+            test._testMethodName).__unittest_skip_why__
+            for test in suite if runner.is_skipped_before_setup(test)}
+
+    def testCharybdis(self):
+        names = ['testPlain', 'testSasl', 'testCapability']
+        test_case_class = sasl_test_case(CharybdisController)
+        self.assertEqual(self.skipReasons(test_case_class, names), {
+            'testPlain': 'Unsupported SASL mechanism: PLAIN',
+            'testSasl': 'Not implemented by controller: SASL',
+            'testCapability': 'Unsupported capability: sasl'})
+        suite = unittest.TestSuite(test_case_class(name) for name in names)
+        runner.skip_unmet_requirements(suite)
+        result = run_tests(suite)
+        self.assertEqual(len(result.skipped), 3)
+        self.assertTrue(result.wasSuccessful())
+
+    def testUndeclaredCapabilities(self):
+        self.assertEqual(self.skipReasons(
+            sasl_test_case(SopelLikeController),
+            ['testPlain', 'testSasl', 'testCapability']),
+            {'testCapability': 'Unsupported capability: sasl'})
+
+    def testControllerWithoutAttributes(self):
+        self.assertEqual(self.skipReasons(sasl_test_case(FakeController),
+            ['testPlain', 'testSasl', 'testCapability']), {
+            'testPlain': 'Unsupported SASL mechanism: PLAIN',
+            'testSasl': 'Not implemented by controller: SASL',
+            'testCapability': 'Unsupported capability: sasl'})
+
+    def testCheckFailureDoesNotAbort(self):
+        class BrokenTestCase(FakeTestCase):
+            def checkRequirements(self):
+                raise AttributeError('supported_capabilities')
+        suite = make_suite('testUndecorated')
+        suite.addTest(BrokenTestCase('testNotRequired'))
+        runner.skip_unmet_requirements(suite)
+        self.assertFalse(any(map(runner.is_skipped_before_setup, suite)))
+
+if __name__ == '__main__':
+    unittest.main()
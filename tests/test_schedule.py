@@ -0,0 +1,117 @@
+import os
+import types
+import tempfile
+import unittest
+from unittest import mock
+
+from irctest import runner
+from irctest import schedule
+from irctest.parallel import RecordedTest
+
+def make_tests(*ids):
+    return [RecordedTest(test_id, test_id, None, [('success', None)], 0)
+            for test_id in ids]
+
+def ids(tests):
+    return [test.id() for test in tests]
+
+class ScheduleTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                {'IRCTEST_CACHE_DIR': self.cache_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.timings = schedule.TimingStore('foo')
+
+    def testEstimate(self):
+        (t1, t2, t3) = make_tests('t1', 't2', 't3')
+        self.assertEqual(self.timings.estimate(t1),
+                schedule.DEFAULT_DURATION)
+        self.timings.update({'t1': 1.0, 't2': 3.0})
+        self.assertEqual(self.timings.estimate(t1), 1.0)
+        self.assertEqual(self.timings.estimate(t2), 3.0)
+        # Average of known tests
+        self.assertEqual(self.timings.estimate(t3), 2.0)
+
+    def testUpdateIsSaved(self):
+        self.timings.update({'t1': 1.5})
+        self.assertEqual(schedule.TimingStore('foo').durations, {'t1': 1.5})
+        self.assertEqual(schedule.TimingStore('bar').durations, {})
+
+    def testRecordRun(self):
+        class FakeTestCase(unittest.TestCase):
+            def testRan(self):
+                pass
+            def testSkipped(self):
+                pass
+        (ran, skipped) = (FakeTestCase('testRan'), FakeTestCase('testSkipped'))
+        runner.skip_before_setup(skipped, 'Not supported')
+        (replayed,) = make_tests('replayed')
+        result = types.SimpleNamespace(test_durations={
+            ran.id(): 2.0, skipped.id(): 0.0, replayed.id(): 0.0})
+        self.timings.update({skipped.id(): 3.0, replayed.id(): 4.0})
+        self.timings.record_run([ran, skipped, replayed], result)
+        self.assertEqual(schedule.TimingStore('foo').durations, {
+            ran.id(): 2.0, skipped.id(): 3.0, replayed.id(): 4.0})
+
+    def testLongestFirst(self):
+        self.timings.update({'a': 1, 'b': 3, 'c': 2, 'd': 3})
+        suite = unittest.TestSuite([unittest.TestSuite(make_tests('a', 'b')),
+            unittest.TestSuite(make_tests('c', 'd'))])
+        self.assertEqual(ids(self.timings.longest_first(suite)),
+                ['b', 'd', 'c', 'a'])
+
+    def testBinPack(self):
+        self.timings.update({'a': 5, 'b': 4, 'c': 3, 'd': 2, 'e': 2})
+        bins = self.timings.bin_pack(make_tests('e', 'd', 'c', 'b', 'a'), 2)
+        self.assertEqual([(total, ids(tests)) for (total, tests) in bins],
+                [(9, ['a', 'd', 'e']), (7, ['b', 'c'])])
+
+    def testBinPackMoreBinsThanTests(self):
+        self.timings.update({'a': 1})
+        bins = self.timings.bin_pack(make_tests('a'), 3)
+        self.assertEqual([(total, ids(tests)) for (total, tests) in bins],
+                [(1, ['a']), (0, []), (0, [])])
+
+    def testEstimateDuration(self):
+        self.timings.update({'a': 5, 'b': 4, 'c': 3, 'd': 2, 'e': 2})
+        suite = unittest.TestSuite(make_tests('a', 'b', 'c', 'd', 'e'))
+        self.assertEqual(self.timings.estimate_duration(suite, 1), 16)
+        self.assertEqual(self.timings.estimate_duration(suite, 2), 9)
+        self.assertEqual(self.timings.estimate_duration(suite, 5), 5)
+
+    def testShard(self):
+        tests = make_tests('e', 'd', 'c', 'b', 'a')
+        shards = [ids(schedule.shard(unittest.TestSuite(tests), i, 2))
+                for i in (1, 2)]
+        self.assertEqual(shards, [['a', 'c', 'e'], ['b', 'd']])
+
+    def testShardWithTimings(self):
+        self.timings.update({'a': 5, 'b': 4, 'c': 3, 'd': 2, 'e': 2})
+        tests = make_tests('e', 'd', 'c', 'b', 'a')
+        shards = [ids(schedule.shard(unittest.TestSuite(tests), i, 2,
+                self.timings)) for i in (1, 2)]
+        self.assertEqual(shards, [['a', 'd', 'e'], ['b', 'c']])
+
+    def testShardIgnoresSkips(self):
+        # Which tests are skipped before setUp depends on each machine's
+        # probe cache.
+        self.timings.update({'a': 5, 'b': 4, 'c': 3, 'd': 2, 'e': 2})
+        tests = make_tests('e', 'd', 'c', 'b', 'a')
+        with mock.patch('irctest.runner.is_skipped_before_setup',
+                lambda test: test.id() == 'a'):
+            shards = [ids(schedule.shard(unittest.TestSuite(tests), i, 2,
+                    self.timings)) for i in (1, 2)]
+        self.assertEqual(shards, [['a', 'd', 'e'], ['b', 'c']])
+
+    def testShardsCoverAllTests(self):
+        tests = make_tests(*('t{}'.format(i) for i in range(10)))
+        for timings in (None, self.timings):
+            shards = [ids(schedule.shard(unittest.TestSuite(tests), i, 3,
+                    timings)) for i in (1, 2, 3)]
+            self.assertEqual(sorted(sum(shards, [])), sorted(ids(tests)))
+
+if __name__ == '__main__':
+    unittest.main()
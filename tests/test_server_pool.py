@@ -0,0 +1,146 @@
+import unittest
+import itertools
+
+from irctest import server_pool
+
+class FakeProcess:
+    def __init__(self):
+        self.returncode = None
+    def poll(self):
+        return self.returncode
+
+class FakeController:
+    def __init__(self):
+        self.proc = None
+        self.dirty = False
+        self.killed = False
+    def run(self, hostname, port, **parameters):
+        self.proc = FakeProcess()
+        self.parameters = parameters
+    def wait_for_port(self, hostname):
+        pass
+    def kill(self):
+        self.killed = True
+
+class FakePortBroker:
+    def __init__(self):
+        self.ports = itertools.count(1000)
+    def reserve(self):
+        return ('127.0.0.1', next(self.ports))
+
+class FakeCase:
+    controllerClass = FakeController
+    port_broker = FakePortBroker()
+    def __init__(self, **parameters):
+        self.parameters = parameters
+    def server_parameters(self):
+        return self.parameters
+    def find_hostname_and_port(self):
+        (self.hostname, self.port) = self.port_broker.reserve()
+
+class ServerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.pool = server_pool.ServerPool()
+        self.addCleanup(self.pool.close)
+
+    def run_case(self, case):
+        """Acquires a server like setUp does, and returns it; the caller
+        releases it like tearDown."""
+        (case.controller, case.hostname, case.port) = \
+                self.pool.acquire(case)
+        return case.controller
+
+    def testReused(self):
+        case1 = FakeCase(password=None, valid_metadata_keys=set())
+        controller = self.run_case(case1)
+        self.pool.release(case1)
+        case2 = FakeCase(password=None, valid_metadata_keys=frozenset())
+        self.assertIs(self.run_case(case2), controller)
+        self.assertEqual(case2.port, case1.port)
+        self.assertFalse(controller.killed)
+
+    def testDifferentParameters(self):
+        case1 = FakeCase(password=None)
+        controller = self.run_case(case1)
+        self.pool.release(case1)
+        case2 = FakeCase(password='secret')
+        self.assertIsNot(self.run_case(case2), controller)
+        self.pool.release(case2)
+        # Both are kept
+        self.assertIs(self.run_case(FakeCase(password=None)), controller)
+
+    def testDirty(self):
+        case = FakeCase()
+        controller = self.run_case(case)
+        controller.dirty = True
+        self.pool.release(case)
+        self.assertTrue(controller.killed)
+        self.assertIsNot(self.run_case(FakeCase()), controller)
+
+    def testExited(self):
+        case = FakeCase()
+        controller = self.run_case(case)
+        self.pool.release(case)
+        controller.proc.returncode = 1
+        self.assertIsNot(self.run_case(FakeCase()), controller)
+        self.assertTrue(controller.killed)
+
+    def testClose(self):
+        cases = [FakeCase(password=None), FakeCase(password='secret')]
+        controllers = [self.run_case(case) for case in cases]
+        for case in cases:
+            self.pool.release(case)
+        self.pool.close()
+        self.assertTrue(all(controller.killed for controller in controllers))
+
+class PrefetchedController(FakeController):
+    instances = []
+    fail = False
+    def __init__(self):
+        super().__init__()
+        self.instances.append(self)
+    def wait_for_port(self, hostname):
+        if self.fail:
+            raise OSError('Server did not start')
+
+class ServerPrefetcherTestCase(unittest.TestCase):
+    def setUp(self):
+        PrefetchedController.instances = []
+        self.prefetcher = server_pool.ServerPrefetcher(
+                PrefetchedController, FakePortBroker(), 2)
+        self.addCleanup(self.prefetcher.close)
+
+    def testAcquire(self):
+        servers = [self.prefetcher.acquire() for i in range(3)]
+        self.assertEqual(len({server.port for server in servers}), 3)
+        self.assertTrue(all(server.controller.proc.poll() is None
+            for server in servers))
+        # Replaced as they are taken
+        self.assertEqual(len(self.prefetcher.queue), 2)
+
+    def testExitedServersAreReplaced(self):
+        for future in self.prefetcher.queue:
+            future.result().controller.proc.returncode = 1
+        server = self.prefetcher.acquire()
+        self.assertIsNone(server.controller.proc.poll())
+        self.assertEqual(sum(controller.killed
+            for controller in PrefetchedController.instances), 2)
+
+    def testStartFailure(self):
+        PrefetchedController.fail = True
+        try:
+            prefetcher = server_pool.ServerPrefetcher(
+                    PrefetchedController, FakePortBroker(), 1)
+            with self.assertRaises(OSError):
+                prefetcher.acquire()
+            prefetcher.close()
+        finally:
+            PrefetchedController.fail = False
+
+    def testClose(self):
+        self.prefetcher.close()
+        self.assertTrue(all(controller.killed
+            for controller in PrefetchedController.instances))
+
+if __name__ == '__main__':
+    unittest.main()
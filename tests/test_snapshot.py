@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from irctest import snapshot
+from irctest.basecontrollers import BaseServerController
+
+class FakeController(BaseServerController):
+    software_name = 'Fake'
+    software_executable = 'python3'
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                {'IRCTEST_CACHE_DIR': self.cache_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.nb_builds = 0
+
+    def build(self, directory):
+        self.nb_builds += 1
+        os.makedirs(os.path.join(directory, 'tls'))
+        with open(os.path.join(directory, 'tls', 'cert.pem'), 'w') as fd:
+            fd.write('cert')
+        with open(os.path.join(directory, 'db'), 'w') as fd:
+            fd.write('empty db')
+
+    def restore(self, controller=None, build=None):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        snapshot.restore_snapshot(controller or FakeController(), 'foo',
+                build or self.build, directory.name, mutable_files=['db'])
+        return directory.name
+
+    def testBuiltOnce(self):
+        for i in range(2):
+            directory = self.restore()
+            with open(os.path.join(directory, 'tls', 'cert.pem')) as fd:
+                self.assertEqual(fd.read(), 'cert')
+            with open(os.path.join(directory, 'db')) as fd:
+                self.assertEqual(fd.read(), 'empty db')
+        self.assertEqual(self.nb_builds, 1)
+
+    def testMutableFilesAreCopied(self):
+        directory1 = self.restore()
+        with open(os.path.join(directory1, 'db'), 'w') as fd:
+            fd.write('changed')
+        directory2 = self.restore()
+        with open(os.path.join(directory2, 'db')) as fd:
+            self.assertEqual(fd.read(), 'empty db')
+        self.assertTrue(os.path.samefile(
+            os.path.join(directory1, 'tls', 'cert.pem'),
+            os.path.join(directory2, 'tls', 'cert.pem')))
+
+    def testFailedBuildIsNotSaved(self):
+        def build(directory):
+            self.build(directory)
+            raise OSError('initialization failed')
+        with self.assertRaises(OSError):
+            self.restore(build=build)
+        self.restore()
+        self.assertEqual(self.nb_builds, 2)
+
+    def testUnknownSoftware(self):
+        class Missing(FakeController):
+            software_executable = 'irctest-no-such-executable'
+        self.restore(Missing())
+        self.restore(Missing())
+        self.assertEqual(self.nb_builds, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from irctest import tls
+
+@unittest.skipUnless(shutil.which('openssl'), 'openssl is not installed')
+class MaterialDirectoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.cache_dir.cleanup)
+        patcher = mock.patch.dict(os.environ,
+                {'IRCTEST_CACHE_DIR': self.cache_dir.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read(self, directory):
+        contents = []
+        for name in (tls.KEY_FILE, tls.CERT_FILE, tls.DH_FILE):
+            with open(os.path.join(directory, name), 'rb') as fd:
+                contents.append(fd.read())
+        return contents
+
+    def testGeneratedOnce(self):
+        with tls.material_directory() as directory:
+            contents = self.read(directory)
+        self.assertTrue(all(contents))
+        with tls.material_directory() as directory:
+            self.assertEqual(self.read(directory), contents)
+
+    def testRenewed(self):
+        with tls.material_directory() as directory:
+            contents = self.read(directory)
+            old = os.path.getmtime(os.path.join(directory, tls.KEY_FILE)) \
+                    - tls.MAX_AGE
+            os.utime(os.path.join(directory, tls.KEY_FILE), (old, old))
+        with tls.material_directory() as directory:
+            new_contents = self.read(directory)
+        self.assertNotEqual(new_contents[0], contents[0])
+        self.assertNotEqual(new_contents[1], contents[1])
+        # No temporary directory is left
+        self.assertEqual(sorted(os.listdir(directory)),
+                sorted(['lock', tls.KEY_FILE, tls.CERT_FILE, tls.DH_FILE]))
+
+if __name__ == '__main__':
+    unittest.main()